@@ -0,0 +1,63 @@
+import gzip
+import random
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import CommandError
+from django.urls import resolve, reverse
+
+from posts.management.commands import bench_views
+
+# Страница сайта -> то же самое в API
+API_VIEWS = {
+    "posts:index": "api:index",
+    "posts:group_list": "api:group_list",
+    "posts:profile": "api:profile",
+    "posts:post_detail": "api:post_detail",
+    "posts:follow_index": "api:follow_index",
+}
+
+
+class Command(bench_views.Command):
+    help = (
+        "Сравнивает ленты сайта и JSON API: байты ответа (с gzip и без) "
+        "и процессорное время на запрос"
+    )
+
+    def fetch(self, client, url, cold):
+        if cold:
+            cache.clear()
+        start = time.process_time()
+        response = client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        cpu = time.process_time() - start
+        if response.status_code != 200:
+            raise CommandError(f"{url}: {response.status_code}")
+        content = response.content
+        if response.get("Content-Encoding") == "gzip":
+            return cpu, len(gzip.decompress(content)), len(content)
+        return cpu, len(content), len(gzip.compress(content))
+
+    def handle(self, *args, requests, cold, **options):
+        random.seed(options["seed"])
+        self.stdout.write(
+            f"{'view':<14}{'':>6}{'байт':>9}{'gzip':>8}{'CPU мс':>9}"
+        )
+        for name, urls in self.targets(requests).items():
+            results = {"html": [], "api": []}
+            for _ in range(requests):
+                client, url = random.choice(urls)
+                match = resolve(url)
+                api_url = reverse(
+                    API_VIEWS[match.view_name], kwargs=match.kwargs
+                )
+                results["html"].append(self.fetch(client, url, cold))
+                results["api"].append(self.fetch(client, api_url, cold))
+            for kind, samples in results.items():
+                cpu, size, compressed = (
+                    statistics.mean(column) for column in zip(*samples)
+                )
+                self.stdout.write(
+                    f"{name if kind == 'html' else '':<14}{kind:>6}"
+                    f"{size:>9.0f}{compressed:>8.0f}{cpu * 1000:>9.2f}"
+                )
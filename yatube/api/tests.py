@@ -0,0 +1,138 @@
+import gzip
+import json
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+INDEX = reverse("api:index")
+FOLLOW = reverse("api:follow_index")
+GROUP_LIST = reverse("api:group_list", args=["api_group"])
+PROFILE = reverse("api:profile", args=["api_author"])
+
+
+@override_settings(API_PAGE_COUNT=2)
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="api_author")
+        cls.reader = User.objects.create_user(username="api_reader")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.group = Group.objects.create(
+            slug="api_group", title="Группа", description="Описание"
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f"Пост {i}"
+            )
+            for i in range(3)
+        ]
+        cls.post = cls.posts[-1]
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.reader, text="Комментарий"
+        )
+        cls.POST_DETAIL = reverse("api:post_detail", args=[cls.post.pk])
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_json(self, url, client=None, **params):
+        response = (client or self.client).get(url, params)
+        return response.status_code, json.loads(response.content)
+
+    def test_feeds(self):
+        """Ленты отдают посты с курсорной пагинацией."""
+        for url, client in (
+            (INDEX, None),
+            (GROUP_LIST, None),
+            (PROFILE, None),
+            (FOLLOW, self.reader_client),
+        ):
+            with self.subTest(url=url):
+                status, data = self.get_json(url, client)
+                self.assertEqual(status, HTTPStatus.OK)
+                self.assertEqual(
+                    data["results"][0],
+                    {
+                        "id": self.post.pk,
+                        "text": self.post.text,
+                        "pub_date": DjangoJSONEncoder().default(
+                            self.post.pub_date
+                        ),
+                        "author": "api_author",
+                        "group": "api_group",
+                        "image": None,
+                    },
+                )
+                _, next_page = self.get_json(url, client, cursor=data["next"])
+                self.assertEqual(
+                    [post["id"] for post in data["results"]]
+                    + [post["id"] for post in next_page["results"]],
+                    [post.pk for post in reversed(self.posts)],
+                )
+                self.assertIsNone(next_page["next"])
+
+    def test_fields(self):
+        """?fields= выбирает поля, неизвестное поле - ошибка 400."""
+        _, data = self.get_json(INDEX, fields="id,author")
+        self.assertEqual(
+            data["results"][0], {"id": self.post.pk, "author": "api_author"}
+        )
+        status, data = self.get_json(INDEX, fields="id,password")
+        self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+        self.assertIn("password", data["detail"])
+
+    def test_post_detail(self):
+        """Пост отдается вместе с первой страницей комментариев."""
+        _, data = self.get_json(self.POST_DETAIL, fields="id")
+        self.assertEqual(data["id"], self.post.pk)
+        self.assertEqual(
+            data["comments"]["results"][0]["text"], self.comment.text
+        )
+
+    def test_errors(self):
+        """Ошибки отдаются в JSON."""
+        cases = (
+            (
+                reverse("api:group_list", args=["missing"]),
+                HTTPStatus.NOT_FOUND,
+            ),
+            (reverse("api:post_detail", args=[0]), HTTPStatus.NOT_FOUND),
+            (FOLLOW, HTTPStatus.UNAUTHORIZED),
+        )
+        for url, expected in cases:
+            with self.subTest(url=url):
+                status, data = self.get_json(url)
+                self.assertEqual(status, expected)
+                self.assertIn("detail", data)
+        self.assertEqual(
+            self.client.post(INDEX).status_code,
+            HTTPStatus.METHOD_NOT_ALLOWED,
+        )
+
+    def test_gzip_and_conditional_get(self):
+        """Ответ сжимается и поддерживает условный GET."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text="Длинный пост " * 50)
+            for _ in range(2)
+        )
+        response = self.client.get(INDEX, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(
+            len(json.loads(gzip.decompress(response.content))["results"]), 2
+        )
+        response = self.client.get(INDEX, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_query_count(self):
+        """Страница ленты - один запрос к базе."""
+        self.get_json(INDEX)
+        with self.assertNumQueries(1):
+            self.get_json(INDEX, cursor="")
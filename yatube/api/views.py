@@ -0,0 +1,187 @@
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_safe
+
+from posts import caching, timeline
+from posts.models import Comment, Group, Post, User
+from posts.utils import CursorPaginator
+from posts.views import (
+    follow_scopes,
+    group_scopes,
+    post_scopes,
+    profile_scopes,
+)
+
+# Поле ответа -> поле для values(). Объекты моделей не создаются,
+# строки базы сразу превращаются в JSON.
+POST_FIELDS = {
+    "id": "id",
+    "text": "text",
+    "pub_date": "pub_date",
+    "author": "author__username",
+    "group": "group__slug",
+    "image": "image",
+}
+COMMENT_FIELDS = {
+    "id": "id",
+    "text": "text",
+    "pub_date": "pub_date",
+    "author": "author__username",
+}
+# Нужны курсору, поэтому выбираются всегда.
+CURSOR_FIELDS = {"id", "pub_date"}
+
+# Без пробелов и \uXXXX-экранирования кириллицы.
+JSON_PARAMS = {"separators": (",", ":"), "ensure_ascii": False}
+
+
+def json_response(data, status=HTTPStatus.OK):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def error(detail, status):
+    return json_response({"detail": detail}, status)
+
+
+def api_view(view):
+    # Только чтение, ответ сжимается, ошибки отдаются в JSON,
+    # а не страницами сайта.
+    @gzip_page
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return error("Не найдено", HTTPStatus.NOT_FOUND)
+        except ValidationError as exc:
+            return error(exc.message, HTTPStatus.BAD_REQUEST)
+
+    return wrapper
+
+
+def authenticated(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error("Требуется авторизация", HTTPStatus.UNAUTHORIZED)
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def selected_fields(request, available):
+    # ?fields=id,text выбирает поля ответа, по умолчанию отдаются все.
+    names = request.GET.get("fields")
+    if not names:
+        return list(available)
+    names = list(dict.fromkeys(names.split(",")))
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValidationError(f"Неизвестные поля: {', '.join(unknown)}")
+    return names
+
+
+def rows(queryset, names, available):
+    return queryset.values(
+        *{available[name] for name in names} | CURSOR_FIELDS
+    )
+
+
+def serialize(row, names, available):
+    item = {name: row[available[name]] for name in names}
+    if "image" in item:
+        item["image"] = (
+            default_storage.url(item["image"]) if item["image"] else None
+        )
+    return item
+
+
+def page_data(queryset, cursor, names, available):
+    page = CursorPaginator(
+        rows(queryset, names, available), settings.API_PAGE_COUNT
+    ).get_page(cursor)
+    return {
+        "results": [serialize(row, names, available) for row in page],
+        "next": page.next_cursor,
+        "previous": page.previous_cursor,
+    }
+
+
+def feed_response(request, queryset):
+    return json_response(
+        page_data(
+            queryset,
+            request.GET.get("cursor"),
+            selected_fields(request, POST_FIELDS),
+            POST_FIELDS,
+        )
+    )
+
+
+@api_view
+@caching.conditional(lambda request: [caching.INDEX])
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@api_view
+@caching.conditional(group_scopes)
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only("pk"), slug=slug)
+    return feed_response(request, group.posts.all())
+
+
+@api_view
+@caching.conditional(profile_scopes)
+def profile(request, username):
+    author = get_object_or_404(User.objects.only("pk"), username=username)
+    return feed_response(request, author.posts.all())
+
+
+@api_view
+@authenticated
+@caching.conditional(follow_scopes)
+def follow_index(request):
+    return feed_response(request, timeline.feed(request.user))
+
+
+@api_view
+@caching.conditional(post_scopes)
+def post_detail(request, post_id):
+    # Пост с первой страницей комментариев.
+    names = selected_fields(request, POST_FIELDS)
+    post = serialize(
+        get_object_or_404(
+            rows(Post.objects.all(), names, POST_FIELDS), pk=post_id
+        ),
+        names,
+        POST_FIELDS,
+    )
+    post["comments"] = page_data(
+        Comment.objects.filter(post_id=post_id),
+        None,
+        list(COMMENT_FIELDS),
+        COMMENT_FIELDS,
+    )
+    return json_response(post)
+
+
+@api_view
+@caching.conditional(post_scopes)
+def post_comments(request, post_id):
+    return json_response(
+        page_data(
+            Comment.objects.filter(post_id=post_id),
+            request.GET.get("cursor"),
+            selected_fields(request, COMMENT_FIELDS),
+            COMMENT_FIELDS,
+        )
+    )
@@ -0,0 +1,73 @@
+import math
+import random
+import secrets
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+LOCK_KEY = "{}:lock"
+
+
+def is_fresh(entry, version, now):
+    # Значение устарело, если сменилась версия или подошел срок.
+    # Срок сдвигается случайно и тем раньше, чем дольше пересчет
+    # (probabilistic early expiration), чтобы воркеры не обновляли
+    # ключ одновременно.
+    if entry["version"] != version:
+        return False
+    if entry["expires"] is None:
+        return True
+    early = -entry["delta"] * settings.CACHE_EARLY_EXPIRY_BETA * math.log(
+        1.0 - random.random()
+    )
+    return now + early < entry["expires"]
+
+
+def single_flight(key, compute, timeout=None, version=None, cacheable=None):
+    """Возвращает значение из кэша, пересчитывая его в одном воркере.
+
+    Пока лидер держит блокировку и пересчитывает значение, остальные
+    получают устаревшее значение (stale-while-revalidate), а если его
+    нет - ждут лидера не дольше CACHE_LOCK_WAIT и считают сами.
+    Значение, для которого cacheable(value) ложно, не сохраняется.
+    """
+    now = time.time()
+    entry = cache.get(key)
+    if entry is not None and is_fresh(entry, version, now):
+        return entry["value"]
+    lock = LOCK_KEY.format(key)
+    # Блокировка помечена воркером: если она истекла и ее взял другой,
+    # чужую не удаляем.
+    token = secrets.token_hex(8)
+    if cache.add(lock, token, settings.CACHE_LOCK_TIMEOUT):
+        try:
+            value = compute()
+            delta = time.time() - now
+            if cacheable is None or cacheable(value):
+                cache.set(
+                    key,
+                    {
+                        "value": value,
+                        "version": version,
+                        "delta": delta,
+                        "expires": None if timeout is None else now + timeout,
+                    },
+                    # Устаревшее значение живет еще CACHE_STALE_TIMEOUT,
+                    # чтобы было что отдать во время пересчета.
+                    None if timeout is None
+                    else timeout + settings.CACHE_STALE_TIMEOUT,
+                )
+        finally:
+            if cache.get(lock) == token:
+                cache.delete(lock)
+        return value
+    if entry is not None:
+        return entry["value"]
+    deadline = now + settings.CACHE_LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None and entry["version"] == version:
+            return entry["value"]
+    return compute()
@@ -0,0 +1,227 @@
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .instrumentation import record_cache
+
+ACCESS_RESOLUTION = 1.0
+
+# Число и суммарный размер записей хранятся в stats и обновляются
+# триггерами, чтобы проверка пределов при записи не читала таблицу.
+# size стоит перед value: строка читается без страниц переполнения
+# BLOB, а вытеснение идет по покрывающему индексу (accessed, size).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL,
+    value BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed, size);
+CREATE TABLE IF NOT EXISTS stats (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    count INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO stats VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE stats SET count = count + 1, size = size + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE stats SET count = count - 1, size = size - old.size;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries
+BEGIN
+    UPDATE stats SET size = size + new.size - old.size;
+END;
+"""
+
+
+class SQLiteCache(BaseCache):
+    """Общий для всех процессов хоста кэш в файле SQLite.
+
+    LOCATION - путь к файлу. Кроме MAX_ENTRIES поддерживается
+    OPTIONS["MAX_SIZE"] - предел суммарного размера значений в байтах.
+    При переполнении удаляются давно не читавшиеся записи (LRU).
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get("OPTIONS", {})
+        self._max_size = int(options.get("MAX_SIZE", 64 * 1024 * 1024))
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            # Иначе INSERT OR REPLACE не вызывает entries_delete.
+            db.execute("PRAGMA recursive_triggers=ON")
+            db.executescript(SCHEMA)
+            self._local.db = db
+        return db
+
+    def _write(self, db, key, value, timeout, replace=True):
+        data = pickle.dumps(value, self.pickle_protocol)
+        db.execute(
+            f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO entries "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                key,
+                self.get_backend_timeout(timeout),
+                time.time(),
+                len(data),
+                data,
+            ),
+        )
+        return db.total_changes
+
+    def _cull(self, db):
+        count, size = db.execute(
+            "SELECT count, size FROM stats WHERE id = 0"
+        ).fetchone()
+        if count <= self._max_entries and size <= self._max_size:
+            return
+        db.execute(
+            "DELETE FROM entries WHERE expires IS NOT NULL AND expires < ?",
+            (time.time(),),
+        )
+        # Удаляем давно не читавшиеся записи, пока не уложимся в оба
+        # предела с запасом в 1/CULL_FREQUENCY.
+        db.execute(
+            "DELETE FROM entries WHERE rowid IN ("
+            " SELECT rowid FROM ("
+            "  SELECT rowid, SUM(size) OVER (ORDER BY accessed DESC) AS total,"
+            "  ROW_NUMBER() OVER (ORDER BY accessed DESC) AS position"
+            "  FROM entries)"
+            " WHERE position > ? OR total > ?)",
+            (
+                self._max_entries - self._max_entries // self._cull_frequency,
+                self._max_size - self._max_size // self._cull_frequency,
+            ),
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        db = self._db
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                "DELETE FROM entries WHERE key = ? AND expires < ?",
+                (key, time.time()),
+            )
+            before = db.total_changes
+            added = self._write(db, key, value, timeout, False) > before
+            if added:
+                self._cull(db)
+        return added
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._get_many([key]).get(key, default)
+
+    def _get_many(self, keys):
+        db = self._db
+        now = time.time()
+        rows = db.execute(
+            "SELECT key, value, accessed FROM entries WHERE key IN "
+            f"({', '.join('?' * len(keys))}) "
+            "AND (expires IS NULL OR expires > ?)",
+            (*keys, now),
+        ).fetchall()
+        # Время чтения обновляем не чаще раза в ACCESS_RESOLUTION секунд:
+        # каждое UPDATE берет блокировку записи на весь файл.
+        touched = [
+            key
+            for key, _, accessed in rows
+            if accessed < now - ACCESS_RESOLUTION
+        ]
+        if touched:
+            db.execute(
+                "UPDATE entries SET accessed = ? WHERE key IN "
+                f"({', '.join('?' * len(touched))})",
+                (now, *touched),
+            )
+        record_cache(len(rows), len(keys) - len(rows))
+        return {key: pickle.loads(value) for key, value, _ in rows}
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_key(key, version=version): key for key in keys}
+        for key in keys:
+            self.validate_key(key)
+        if not keys:
+            return {}
+        return {
+            keys[key]: value
+            for key, value in self._get_many(list(keys)).items()
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        db = self._db
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            self._write(db, key, value, timeout)
+            self._cull(db)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        cursor = self._db.execute(
+            "UPDATE entries SET expires = ? WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (self.get_backend_timeout(timeout), key, time.time()),
+        )
+        return bool(cursor.rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        # В отличие от BaseCache.incr атомарно между процессами.
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        db = self._db
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT value FROM entries WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            data = pickle.dumps(value, self.pickle_protocol)
+            db.execute(
+                "UPDATE entries SET value = ?, size = ?, accessed = ? "
+                "WHERE key = ?",
+                (data, len(data), time.time(), key),
+            )
+        return value
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def has_key(self, key, version=None):
+        return self.get(key, self, version=version) is not self
+
+    def clear(self):
+        self._db.execute("DELETE FROM entries")
+
+    def close(self, **kwargs):
+        # Соединение живет весь поток: Django закрывает кэши после
+        # каждого запроса, а открывать файл заново дорого.
+        pass
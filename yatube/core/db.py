@@ -0,0 +1,67 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    # Прагмы действуют только на соединение, поэтому применяются
+    # к каждому новому. С CONN_MAX_AGE это раз на поток, а не на запрос.
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+_state = threading.local()
+
+
+def primary(view):
+    # Помечает представление, которое пишет в базу: все его запросы,
+    # и чтение тоже, идут в основную базу.
+    view.use_primary = True
+    return view
+
+
+def use_replica(enabled):
+    _state.use_replica = enabled
+
+
+@contextmanager
+def pin_primary():
+    previous = getattr(_state, "use_replica", False)
+    _state.use_replica = False
+    try:
+        yield
+    finally:
+        _state.use_replica = previous
+
+
+class PrimaryReplicaRouter:
+    """Чтение - в случайную реплику из DATABASE_REPLICAS, запись -
+    в default.
+
+    Реплики используются только там, где их включил
+    PrimaryReplicaMiddleware: в безопасных запросах к представлениям
+    без @primary. Команды, тесты и оболочка работают с default.
+    """
+
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and getattr(
+            _state, "use_replica", False
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии default, объекты из них можно связывать.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема попадает на реплики вместе с данными.
+        return db not in settings.DATABASE_REPLICAS
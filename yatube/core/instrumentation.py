@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+METRICS_KEY = "metrics:views"
+METRICS_LOCK_KEY = "metrics:views:lock"
+
+# Верхние границы корзин гистограммы времени ответа, мс
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+
+_local = threading.local()
+
+
+class Recorder:
+    """Метрики одного запроса.
+
+    Экземпляр подключается как execute_wrapper к соединениям с базой,
+    шаблоны и кэш находят его через active().
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += time.perf_counter() - start
+
+    def __enter__(self):
+        _local.recorder = self
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.recorder = None
+        self.total_time = time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ", ".join(
+            (
+                f'db;dur={self.sql_time * 1000:.1f};desc="{self.queries} '
+                'queries"',
+                f"render;dur={self.render_time * 1000:.1f}",
+                f'cache;desc="hits={self.cache_hits} '
+                f'misses={self.cache_misses}"',
+                f"total;dur={self.total_time * 1000:.1f}",
+            )
+        )
+
+
+def active():
+    return getattr(_local, "recorder", None)
+
+
+def record_cache(hits, misses):
+    recorder = active()
+    if recorder is not None:
+        recorder.cache_hits += hits
+        recorder.cache_misses += misses
+
+
+def new_histogram():
+    return {
+        "count": 0,
+        "queries": 0,
+        "sql_time": 0.0,
+        "render_time": 0.0,
+        "total_time": 0.0,
+        "cache_hits": 0,
+        "cache_misses": 0,
+        "buckets": [0] * len(BUCKETS),
+    }
+
+
+def merge(target, source):
+    for field, value in source.items():
+        if field == "buckets":
+            target[field] = [a + b for a, b in zip(target[field], value)]
+        else:
+            target[field] += value
+
+
+class Histograms:
+    """Гистограммы по представлениям в памяти процесса.
+
+    Раз в INSTRUMENTATION_FLUSH_INTERVAL секунд накопленное
+    сливается в общий кэш, откуда его читает команда dump_metrics.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = defaultdict(new_histogram)
+        self.flushed = time.monotonic()
+
+    def add(self, view, recorder):
+        total_ms = recorder.total_time * 1000
+        with self.lock:
+            histogram = self.pending[view]
+            histogram["count"] += 1
+            histogram["queries"] += recorder.queries
+            histogram["sql_time"] += recorder.sql_time
+            histogram["render_time"] += recorder.render_time
+            histogram["total_time"] += recorder.total_time
+            histogram["cache_hits"] += recorder.cache_hits
+            histogram["cache_misses"] += recorder.cache_misses
+            for index, bound in enumerate(BUCKETS):
+                if total_ms <= bound:
+                    histogram["buckets"][index] += 1
+                    break
+        if (
+            time.monotonic() - self.flushed
+            >= settings.INSTRUMENTATION_FLUSH_INTERVAL
+        ):
+            self.flush()
+
+    def flush(self):
+        # Не дождались блокировки - сольем в следующий раз.
+        if not cache.add(METRICS_LOCK_KEY, 1, 10):
+            return False
+        try:
+            with self.lock:
+                pending, self.pending = self.pending, defaultdict(
+                    new_histogram
+                )
+                self.flushed = time.monotonic()
+            stored = cache.get(METRICS_KEY) or {}
+            for view, histogram in pending.items():
+                merge(stored.setdefault(view, new_histogram()), histogram)
+            cache.set(METRICS_KEY, stored, None)
+        finally:
+            cache.delete(METRICS_LOCK_KEY)
+        return True
+
+
+histograms = Histograms()
+
+
+def percentile(histogram, fraction):
+    # Верхняя граница корзины, в которую попал перцентиль.
+    rank = histogram["count"] * fraction
+    seen = 0
+    for bound, count in zip(BUCKETS, histogram["buckets"]):
+        seen += count
+        if seen >= rank:
+            return bound
+    return BUCKETS[-1]
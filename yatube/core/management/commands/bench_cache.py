@@ -0,0 +1,54 @@
+import os
+import statistics
+import tempfile
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache_backends import SQLiteCache
+
+
+class Command(BaseCommand):
+    help = "Сравнивает задержку попадания в кэш LocMemCache и SQLiteCache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keys", type=int, default=1000)
+        parser.add_argument("--rounds", type=int, default=10)
+        parser.add_argument(
+            "--size", type=int, default=20000, help="Размер значения, байт"
+        )
+
+    def measure(self, backend, keys, rounds, value):
+        for key in range(keys):
+            backend.set(f"key:{key}", value, None)
+        timings = []
+        for _ in range(rounds):
+            for key in range(keys):
+                start = time.perf_counter()
+                backend.get(f"key:{key}")
+                timings.append(time.perf_counter() - start)
+        timings.sort()
+        return (
+            statistics.median(timings),
+            timings[int(len(timings) * 0.99)],
+        )
+
+    def handle(self, *args, keys, rounds, size, **options):
+        value = os.urandom(size)
+        with tempfile.TemporaryDirectory() as directory:
+            backends = {
+                "locmem": LocMemCache(
+                    "bench", {"OPTIONS": {"MAX_ENTRIES": keys * 2}}
+                ),
+                "sqlite": SQLiteCache(
+                    os.path.join(directory, "cache.sqlite3"),
+                    {"OPTIONS": {"MAX_ENTRIES": keys * 2}},
+                ),
+            }
+            for name, backend in backends.items():
+                p50, p99 = self.measure(backend, keys, rounds, value)
+                self.stdout.write(
+                    f"{name:>8}: p50 {p50 * 1e6:8.1f} мкс, "
+                    f"p99 {p99 * 1e6:8.1f} мкс"
+                )
@@ -0,0 +1,61 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+from django.template.loader import get_template
+from django.test import override_settings
+
+from posts.forms import CommentForm, GroupForm, PostForm
+from users.forms import CreationForm
+
+FORMS = (PostForm, CommentForm, GroupForm, CreationForm)
+
+# Прежний путь: цикл по полям формы в шаблоне и addclass на каждое.
+LOOP = Template(
+    """{% load user_filters %}{% for field in form %}
+<div class="form-group row my-3"
+  aria-required="{{ field.field.required|yesno:'true,false' }}">
+  <label for="{{ field.id_for_label }}">{{ field.label }}
+    {% if field.field.required %}<span>*</span>{% endif %}</label>
+  <div>{{ field|addclass:'form-control' }}
+    {% if field.help_text %}<small id="{{ field.id_for_label }}-help">
+      {{ field.help_text|safe }}</small>{% endif %}</div>
+</div>{% endfor %}"""
+)
+TAG = Template("{% load user_filters %}{% form_fields form %}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает рендеринг форм страниц создания поста, группы "
+        "и регистрации: цикл с addclass против тега form_fields"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--renders", type=int, default=200, help="Рендерингов на форму"
+        )
+
+    def median(self, template, form_class, renders):
+        timings = []
+        for _ in range(renders):
+            start = time.perf_counter()
+            template.render(Context({"form": form_class()}))
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000
+
+    def handle(self, *args, renders, **options):
+        # Шаблоны виджетов компилируются до замеров.
+        get_template("includes/form_field_down.html")
+        self.stdout.write(
+            f"{'form':<14}{'цикл мс':>10}{'тег мс':>10}{'ускорение':>11}"
+        )
+        for form_class in FORMS:
+            with override_settings(FORM_WIDGET_CACHE_SIZE=0):
+                loop = self.median(LOOP, form_class, renders)
+            tag = self.median(TAG, form_class, renders)
+            self.stdout.write(
+                f"{form_class.__name__:<14}{loop:>10.3f}{tag:>10.3f}"
+                f"{loop / tag:>10.1f}x"
+            )
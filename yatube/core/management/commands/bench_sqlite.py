@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SCHEMA = """
+CREATE TABLE post (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    pub_date REAL NOT NULL
+);
+CREATE INDEX post_pub_date ON post (pub_date);
+"""
+
+
+class Profile:
+    def __init__(self, path, pragmas, persistent):
+        self.path = path
+        self.pragmas = pragmas
+        self.persistent = persistent
+        self.local = threading.local()
+
+    def connect(self):
+        db = sqlite3.connect(self.path, isolation_level=None)
+        for pragma, value in self.pragmas.items():
+            db.execute(f"PRAGMA {pragma} = {value}")
+        return db
+
+    def run(self, operation):
+        # Без CONN_MAX_AGE Django открывает соединение на каждый запрос.
+        if not self.persistent:
+            db = self.connect()
+            try:
+                return operation(db)
+            finally:
+                db.close()
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = self.local.db = self.connect()
+        return operation(db)
+
+
+def read(db):
+    return db.execute(
+        "SELECT id, text FROM post ORDER BY pub_date DESC LIMIT 10"
+    ).fetchall()
+
+
+def write(db):
+    with db:
+        db.execute("BEGIN IMMEDIATE")
+        db.execute(
+            "INSERT INTO post (text, pub_date) VALUES (?, ?)",
+            ("x" * 200, time.time()),
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность SQLite при одновременных "
+        "чтении и записи: настройки по умолчанию против SQLITE_PRAGMAS "
+        "с постоянными соединениями"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--rows", type=int, default=10000)
+
+    def measure(self, profile, readers, writers, seconds):
+        counts = {"read": 0, "write": 0, "error": 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + seconds
+
+        def worker(operation, name):
+            done = errors = 0
+            while time.monotonic() < deadline:
+                try:
+                    profile.run(operation)
+                    done += 1
+                except sqlite3.OperationalError:
+                    errors += 1
+            with lock:
+                counts[name] += done
+                counts["error"] += errors
+
+        threads = [
+            threading.Thread(target=worker, args=(read, "read"))
+            for _ in range(readers)
+        ] + [
+            threading.Thread(target=worker, args=(write, "write"))
+            for _ in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {name: count / seconds for name, count in counts.items()}
+
+    def handle(self, *args, readers, writers, seconds, rows, **options):
+        profiles = {
+            "default": ({}, False),
+            "tuned": (settings.SQLITE_PRAGMAS, True),
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            for name, (pragmas, persistent) in profiles.items():
+                path = os.path.join(directory, f"{name}.sqlite3")
+                with sqlite3.connect(path) as db:
+                    db.executescript(SCHEMA)
+                    db.executemany(
+                        "INSERT INTO post (text, pub_date) VALUES (?, ?)",
+                        (("x" * 200, i) for i in range(rows)),
+                    )
+                result = self.measure(
+                    Profile(path, pragmas, persistent),
+                    readers,
+                    writers,
+                    seconds,
+                )
+                self.stdout.write(
+                    f"{name:>8}: чтений {result['read']:9.0f}/с, "
+                    f"записей {result['write']:7.0f}/с, "
+                    f"ошибок {result['error']:5.0f}/с"
+                )
@@ -0,0 +1,39 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from core.instrumentation import METRICS_KEY, percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Выводит метрики представлений, собранные "
+        "InstrumentationMiddleware во всех процессах"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Обнулить метрики после вывода",
+        )
+
+    def handle(self, *args, reset, **options):
+        stored = cache.get(METRICS_KEY) or {}
+        self.stdout.write(
+            f"{'view':<28}{'n':>7}{'p50':>8}{'p95':>8}{'sql':>6}"
+            f"{'sql мс':>8}{'шабл мс':>9}{'кэш':>6}"
+        )
+        for view, histogram in sorted(stored.items()):
+            count = histogram["count"]
+            lookups = histogram["cache_hits"] + histogram["cache_misses"]
+            self.stdout.write(
+                f"{view:<28}{count:>7}"
+                f"{percentile(histogram, 0.5):>8}"
+                f"{percentile(histogram, 0.95):>8}"
+                f"{histogram['queries'] / count:>6.1f}"
+                f"{histogram['sql_time'] * 1000 / count:>8.1f}"
+                f"{histogram['render_time'] * 1000 / count:>9.1f}"
+                f"{histogram['cache_hits'] / lookups if lookups else 0:>6.0%}"
+            )
+        if reset:
+            cache.delete(METRICS_KEY)
@@ -0,0 +1,48 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Копирует основную базу SQLite в реплики из DATABASE_REPLICAS: "
+        "замена настоящей репликации для локальной проверки"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Повторять каждые N секунд (по умолчанию - один раз)",
+        )
+
+    def copy(self, source, target):
+        # backup дает согласованный снимок, даже пока в базу пишут.
+        with closing(sqlite3.connect(source)) as primary, closing(
+            sqlite3.connect(target)
+        ) as replica:
+            primary.backup(replica)
+
+    def handle(self, *args, interval, **options):
+        primary = settings.DATABASES["default"]
+        replicas = [
+            settings.DATABASES[alias] for alias in settings.DATABASE_REPLICAS
+        ]
+        if not replicas:
+            raise CommandError("DATABASE_REPLICAS пуст")
+        if any(
+            database["ENGINE"] != "django.db.backends.sqlite3"
+            for database in [primary, *replicas]
+        ):
+            raise CommandError("Копировать можно только базы SQLite")
+        while True:
+            for replica in replicas:
+                self.copy(primary["NAME"], replica["NAME"])
+            self.stdout.write(f"Реплик обновлено: {len(replicas)}")
+            if not interval:
+                return
+            time.sleep(interval)
@@ -0,0 +1,74 @@
+import random
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .db import use_replica
+from .instrumentation import Recorder, histograms
+
+
+class InstrumentationMiddleware:
+    """Метрики запросов к posts: число и время SQL-запросов, время
+    рендеринга шаблонов, попадания в кэш.
+
+    Замеряется доля INSTRUMENTATION_SAMPLE_RATE запросов; метрики
+    отдаются в заголовке Server-Timing и копятся в гистограммах.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.INSTRUMENTATION_SAMPLE_RATE
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+        with ExitStack() as stack:
+            recorder = stack.enter_context(Recorder())
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is None or match.namespace not in (
+            settings.INSTRUMENTATION_NAMESPACES
+        ):
+            return response
+        response["Server-Timing"] = recorder.server_timing()
+        histograms.add(match.view_name, recorder)
+        return response
+
+
+class PrimaryReplicaMiddleware:
+    """Безопасные запросы читают из реплик, остальные - из default.
+
+    После записи клиент получает cookie и еще REPLICA_LAG секунд
+    читает из default, чтобы увидеть свои изменения, пока реплики
+    их догоняют.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.writes = request.method not in ("GET", "HEAD", "OPTIONS")
+        use_replica(
+            not request.writes
+            and settings.REPLICA_COOKIE not in request.COOKIES
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replica(False)
+        if request.writes and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.REPLICA_COOKIE,
+                "1",
+                max_age=settings.REPLICA_LAG,
+                httponly=True,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(view_func, "use_primary", False):
+            request.writes = True
+            use_replica(False)
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.dispatch import Signal
+
+# Отправляется из _save с именем файла до проверки, сохранен ли он
+# уже: приемник успевает взять ссылку на файл раньше, чем его удалят
+# как ненужный.
+content_saving = Signal(providing_args=["name"])
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы под именем из SHA-256 содержимого.
+
+    Загрузка хэшируется на лету, пока пишется во временный файл
+    рядом с целевым каталогом. Файл с тем же содержимым хранится
+    в одном экземпляре: повторная загрузка возвращает имя уже
+    сохраненного. Из исходного имени остаются каталог (upload_to)
+    и расширение: posts/meme.png -> posts/3f/a9...c2.png.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Имя определяется содержимым в _save, исходное не занимаем.
+        return name
+
+    def hashed_name(self, name, digest):
+        directory, filename = posixpath.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return posixpath.join(
+            directory, digest[:2], f"{digest[2:]}{extension}"
+        )
+
+    def _save(self, name, content):
+        directory = os.path.dirname(self.path(name))
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(
+            dir=directory, prefix=".upload-", delete=False
+        ) as temporary:
+            try:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temporary.write(chunk)
+            except BaseException:
+                os.remove(temporary.name)
+                raise
+        name = self.hashed_name(name, digest.hexdigest())
+        content_saving.send(sender=type(self), storage=self, name=name)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            os.remove(temporary.name)
+            return name
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # Переименование атомарно: одновременная загрузка того же
+        # содержимого просто перезапишет файл таким же.
+        os.replace(temporary.name, full_path)
+        # Временный файл создан с правами 0600.
+        os.chmod(
+            full_path,
+            0o644
+            if self.file_permissions_mode is None
+            else self.file_permissions_mode,
+        )
+        return name
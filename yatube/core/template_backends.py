@@ -0,0 +1,69 @@
+import os
+import time
+
+from django.conf import settings
+from django.template import engines
+from django.template.backends.django import DjangoTemplates, Template
+
+from .instrumentation import active
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        recorder = active()
+        if recorder is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            recorder.render_time += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    # Шаблонизатор Django, который учитывает время рендеринга
+    # в метриках запроса (core.middleware.InstrumentationMiddleware).
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(
+            super().from_string(template_code).template, self
+        )
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(
+            super().get_template(template_name).template, self
+        )
+
+
+def warm_up():
+    # Компилирует все шаблоны из DIRS, чтобы первые запросы не платили
+    # за их разбор. Имеет смысл с cached.Loader (TEMPLATE_CACHE),
+    # без него скомпилированные шаблоны не сохраняются.
+    names = []
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for directory in engine.engine.dirs:
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    name = os.path.relpath(
+                        os.path.join(root, filename), directory
+                    )
+                    engine.get_template(name.replace(os.sep, "/"))
+                    names.append(name)
+    return names
+
+
+def templates(cached):
+    # TEMPLATES с cached.Loader или без него, для override_settings
+    # в тестах и в bench_templates.
+    loaders = settings.TEMPLATE_LOADERS
+    if cached:
+        loaders = [("django.template.loaders.cached.Loader", loaders)]
+    return [
+        dict(
+            engine,
+            OPTIONS=dict(engine["OPTIONS"], loaders=loaders),
+        )
+        for engine in settings.TEMPLATES
+    ]
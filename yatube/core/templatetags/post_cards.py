@@ -0,0 +1,11 @@
+from django import template
+
+from posts.fragments import cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    # Карточки постов страницы из кэша фрагментов (posts.fragments).
+    return cards(posts, context.get("group"))
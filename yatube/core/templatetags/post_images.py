@@ -0,0 +1,11 @@
+from django import template
+
+from posts.thumbnails import picture as picture_data
+
+register = template.Library()
+
+
+@register.inclusion_tag("posts/includes/picture.html")
+def picture(image, css_class=""):
+    # <picture> с вариантами миниатюры разных ширин и форматов
+    return dict(picture_data(image), css_class=css_class)
@@ -0,0 +1,45 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core.cache import single_flight
+
+register = template.Library()
+
+
+class SafeCacheNode(template.Node):
+    def __init__(self, nodelist, expire_time, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.expire_time = expire_time
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        expire_time = self.expire_time.resolve(context)
+        key = make_template_fragment_key(
+            f"safe.{self.fragment_name}",
+            [var.resolve(context) for var in self.vary_on],
+        )
+        return single_flight(
+            key,
+            lambda: self.nodelist.render(context),
+            None if expire_time is None else int(expire_time),
+        )
+
+
+@register.tag("safe_cache")
+def do_safe_cache(parser, token):
+    # Аналог {% cache %} с защитой от одновременного пересчета:
+    # {% safe_cache 300 fragment_name var1 var2 %}...{% endsafe_cache %}
+    nodelist = parser.parse(("endsafe_cache",))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 2 arguments."
+        )
+    return SafeCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+    )
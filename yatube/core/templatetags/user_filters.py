@@ -1,8 +1,57 @@
 from django import template
+from django.conf import settings
 
 register = template.Library()
 
+# Разметка виджетов незаполненных форм. У такой формы она зависит
+# только от класса формы, поля, класса CSS и вариантов выбора, поэтому
+# рендерится один раз на процесс. Формы проекта не меняют поля
+# в __init__ в зависимости от запроса.
+_widgets = {}
+
+
+def _widget_key(field, css):
+    form = field.form
+    if form.is_bound or form.initial or callable(field.field.initial):
+        return None
+    choices = getattr(field.field, "choices", None)
+    return (
+        type(form),
+        form.prefix,
+        form.auto_id,
+        field.name,
+        css,
+        # Для ModelChoiceField - тот же запрос, что сделал бы виджет.
+        None if choices is None else tuple(choices),
+    )
+
 
 @register.filter
 def addclass(field, css):
-    return field.as_widget(attrs={"class": css})
+    key = _widget_key(field, css) if settings.FORM_WIDGET_CACHE_SIZE else None
+    if key is None:
+        return field.as_widget(attrs={"class": css})
+    widget = _widgets.get(key)
+    if widget is None:
+        if len(_widgets) >= settings.FORM_WIDGET_CACHE_SIZE:
+            _widgets.clear()
+        widget = _widgets[key] = field.as_widget(attrs={"class": css})
+    return widget
+
+
+@register.inclusion_tag("includes/form_field_down.html")
+def form_fields(form, css="form-control"):
+    # Поля формы с подписями и подсказками. Все, что нужно шаблону,
+    # считается здесь, а не поиском атрибутов в цикле шаблона.
+    return {
+        "fields": [
+            {
+                "id": field.id_for_label,
+                "label": field.label,
+                "required": field.field.required,
+                "help_text": field.help_text,
+                "widget": addclass(field, css),
+            }
+            for field in form
+        ]
+    }
@@ -1,4 +1,26 @@
-from django.test import TestCase
+import os
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, router
+from django.template import Context, Template, engines
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from posts.forms import PostForm
+from posts.models import Group, Post, User
+
+from .cache import LOCK_KEY, single_flight
+from .instrumentation import METRICS_KEY
+from .cache_backends import SQLiteCache
+from .db import pin_primary, use_replica
+from .template_backends import templates, warm_up
+from .templatetags import user_filters
 
 
 class ViewTestClass(TestCase):
@@ -6,3 +28,256 @@ class ViewTestClass(TestCase):
         response = self.client.get("/nonexist-page/")
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, "core/404.html")
+
+
+class SQLitePragmasTest(TestCase):
+    def test_pragmas_applied(self):
+        """Прагмы из SQLITE_PRAGMAS применяются к соединению."""
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(
+                cursor.fetchone()[0], settings.SQLITE_PRAGMAS["busy_timeout"]
+            )
+
+
+class SingleFlightTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def slow_compute(self):
+        time.sleep(0.01)
+        return self.compute()
+
+    def test_value_computed_once(self):
+        """Значение считается один раз, пока версия не сменится."""
+        self.assertEqual(single_flight("key", self.compute, 60), 1)
+        self.assertEqual(single_flight("key", self.compute, 60), 1)
+        self.assertEqual(single_flight("key", self.compute, 60, "v2"), 2)
+
+    def test_stale_while_revalidate(self):
+        """Пока другой воркер пересчитывает значение, отдается старое."""
+        single_flight("key", self.compute, 60, version=1)
+        cache.add(LOCK_KEY.format("key"), 1)
+        self.assertEqual(single_flight("key", self.compute, 60, 2), 1)
+        self.assertEqual(self.calls, 1)
+
+    @override_settings(CACHE_EARLY_EXPIRY_BETA=10**9)
+    def test_early_expiration(self):
+        """Долгий пересчет обновляет значение раньше срока."""
+        single_flight("key", self.slow_compute, 60)
+        self.assertEqual(single_flight("key", self.compute, 60), 2)
+
+    def test_not_cacheable(self):
+        """Значение, которое cacheable отклонил, не сохраняется."""
+        for _ in range(2):
+            single_flight("key", self.compute, cacheable=lambda value: False)
+        self.assertEqual(self.calls, 2)
+
+    def test_foreign_lock_kept(self):
+        """Лидер не удаляет блокировку, взятую другим воркером."""
+        lock = LOCK_KEY.format("key")
+
+        def compute():
+            # Своя блокировка истекла, ее взял другой воркер.
+            cache.set(lock, "other")
+            return self.compute()
+
+        single_flight("key", compute)
+        self.assertEqual(cache.get(lock), "other")
+
+    @override_settings(CACHE_LOCK_WAIT=0.1)
+    def test_wait_for_leader(self):
+        """Без устаревшего значения лидера ждут недолго."""
+        cache.add(LOCK_KEY.format("key"), "leader")
+        start = time.monotonic()
+        self.assertEqual(single_flight("key", self.compute), 1)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_safe_cache_tag(self):
+        """{% safe_cache %} кэширует фрагмент шаблона."""
+        template = Template(
+            "{% load safe_cache %}"
+            "{% safe_cache 60 fragment name %}{{ value }}{% endsafe_cache %}"
+        )
+        context = {"name": "test", "value": "первое"}
+        self.assertEqual(template.render(Context(context)), "первое")
+        context["value"] = "второе"
+        self.assertEqual(template.render(Context(context)), "первое")
+
+
+class SQLiteCacheTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "cache.sqlite3")
+        self.cache = SQLiteCache(
+            path, {"OPTIONS": {"MAX_ENTRIES": 4, "CULL_FREQUENCY": 2}}
+        )
+
+    def test_get_set_add_incr(self):
+        """Базовые операции кэша."""
+        self.cache.set("key", {"value": 1})
+        self.assertEqual(self.cache.get("key"), {"value": 1})
+        self.assertFalse(self.cache.add("key", 2))
+        self.assertTrue(self.cache.add("other", 2))
+        self.assertEqual(self.cache.incr("other", 3), 5)
+        self.assertEqual(
+            self.cache.get_many(["key", "other", "missing"]),
+            {"key": {"value": 1}, "other": 5},
+        )
+        self.cache.delete("key")
+        self.assertIsNone(self.cache.get("key"))
+        with self.assertRaises(ValueError):
+            self.cache.incr("key")
+
+    def test_expiration(self):
+        """Просроченные значения не возвращаются и не мешают add."""
+        self.cache.set("key", 1, 0)
+        self.assertIsNone(self.cache.get("key"))
+        self.assertTrue(self.cache.add("key", 2))
+
+    def test_stats(self):
+        """Число и размер записей в stats совпадают с таблицей."""
+        self.cache.set("key", "значение")
+        self.cache.set("key", "другое значение")
+        self.cache.add("counter", 1)
+        self.cache.incr("counter", 10**20)
+        self.cache.set("other", 1)
+        self.cache.delete("other")
+        db = self.cache._db
+        self.assertEqual(
+            db.execute("SELECT count, size FROM stats").fetchone(),
+            db.execute("SELECT COUNT(*), SUM(size) FROM entries").fetchone(),
+        )
+
+    def test_lru_eviction(self):
+        """При переполнении удаляются давно не читавшиеся записи."""
+        for key in range(4):
+            self.cache.set(key, key)
+            time.sleep(0.01)
+        self.cache._db.execute(
+            "UPDATE entries SET accessed = ? WHERE key = ?",
+            (time.time(), self.cache.make_key(0)),
+        )
+        self.cache.set(4, 4)
+        self.assertEqual(self.cache.get(0), 0)
+        self.assertEqual(self.cache.get(4), 4)
+        self.assertIsNone(self.cache.get(1))
+
+
+@override_settings(
+    INSTRUMENTATION_SAMPLE_RATE=1, INSTRUMENTATION_FLUSH_INTERVAL=0
+)
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing(self):
+        """Запросы к posts получают Server-Timing и попадают
+        в гистограммы."""
+        timing = self.client.get("/")["Server-Timing"]
+        for metric in ("db;dur=", "queries", "render;dur=", "cache;desc="):
+            self.assertIn(metric, timing)
+        self.assertNotIn("Server-Timing", self.client.get("/about/author/"))
+        self.assertEqual(cache.get(METRICS_KEY)["posts:index"]["count"], 1)
+        out = StringIO()
+        call_command("dump_metrics", "--reset", stdout=out)
+        self.assertIn("posts:index", out.getvalue())
+        self.assertIsNone(cache.get(METRICS_KEY))
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_sampling_off(self):
+        """При выключенной выборке метрики не собираются."""
+        self.assertNotIn("Server-Timing", self.client.get("/"))
+        self.assertIsNone(cache.get(METRICS_KEY))
+
+
+@override_settings(TEMPLATES=templates(cached=True))
+class TemplateWarmUpTest(TestCase):
+    def test_warm_up(self):
+        """warm_up кладет все шаблоны проекта в cached.Loader."""
+        names = warm_up()
+        self.assertIn("posts/index.html", names)
+        loader = engines.all()[0].engine.template_loaders[0]
+        for name in names:
+            self.assertIn(name, loader.get_template_cache)
+
+
+class FormFieldsTest(TestCase):
+    FORM = Template("{% load user_filters %}{% form_fields form %}")
+
+    def setUp(self):
+        user_filters._widgets.clear()
+
+    def render(self, form):
+        return self.FORM.render(Context({"form": form}))
+
+    def test_widgets_cached(self):
+        """Виджеты пустой формы рендерятся один раз, пока не поменялись
+        варианты выбора."""
+        html = self.render(PostForm())
+        self.assertIn('class="form-control"', html)
+        with mock.patch(
+            "django.forms.boundfield.BoundField.as_widget"
+        ) as as_widget:
+            self.assertEqual(self.render(PostForm()), html)
+        as_widget.assert_not_called()
+        Group.objects.create(slug="new", title="Новая группа")
+        self.assertIn("Новая группа", self.render(PostForm()))
+
+    def test_bound_form_not_cached(self):
+        """Заполненная форма показывает введенные данные."""
+        self.render(PostForm())
+        html = self.render(PostForm({"text": "Введенный текст"}))
+        self.assertIn("Введенный текст", html)
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTest(TestCase):
+    databases = {"default", "replica"}
+
+    def replica_queries(self, method, *args, **kwargs):
+        with CaptureQueriesContext(connections["replica"]) as captured:
+            response = method(*args, **kwargs)
+        return response, len(captured)
+
+    def test_router(self):
+        """Реплика только внутри use_replica и вне pin_primary."""
+        self.assertEqual(router.db_for_read(Post), "default")
+        use_replica(True)
+        try:
+            self.assertEqual(router.db_for_read(Post), "replica")
+            self.assertEqual(router.db_for_write(Post), "default")
+            with pin_primary():
+                self.assertEqual(router.db_for_read(Post), "default")
+            self.assertEqual(router.db_for_read(Post), "replica")
+        finally:
+            use_replica(False)
+
+    @override_settings(REPLICA_LAG=0)
+    def test_reads_go_to_replica(self):
+        """Безопасные запросы читают из реплики."""
+        cache.clear()
+        _, queries = self.replica_queries(self.client.get, "/")
+        self.assertGreater(queries, 0)
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class PrimaryPinningTest(TestCase):
+    # Запрос к реплике здесь упадет: ее нет в databases.
+
+    def test_writes_pin_primary(self):
+        """Запись и чтение сразу после нее идут в default."""
+        self.client.force_login(User.objects.create_user(username="author"))
+        response = self.client.post("/create/", {"text": "Пост"})
+        self.assertIn(settings.REPLICA_COOKIE, response.cookies)
+        cache.clear()
+        with override_settings(REPLICA_LAG=0):
+            self.assertEqual(self.client.get("/").status_code, 200)
@@ -0,0 +1,47 @@
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку сразу во временный файл, не держа ее в памяти.
+
+    На диск попадает не больше FILE_UPLOAD_MAX_SIZE байт, остаток
+    отбрасывается, а файл помечается oversized: отказ показывает форма.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.FILE_UPLOAD_MAX_SIZE:
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        oversized = self.received > settings.FILE_UPLOAD_MAX_SIZE
+        file = super().file_complete(
+            self.file.tell() if oversized else file_size
+        )
+        file.oversized = oversized
+        return file
+
+
+def limited_upload(view):
+    # Загрузки представления идут через LimitedUploadHandler, остальные
+    # - через обработчики по умолчанию. Обработчики меняются до чтения
+    # тела запроса, а его читает CsrfViewMiddleware, поэтому CSRF
+    # проверяется здесь, после замены.
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers = [LimitedUploadHandler(request)]
+        return protected(request, *args, **kwargs)
+
+    return wrapper
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Comment, Follow, Group, Post
+from .search import search
 
 
 @admin.register(Group)
@@ -25,6 +26,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        # Полнотекстовый индекс вместо LIKE '%...%' по всем постам.
+        if not search_term:
+            return queryset, False
+        return search(search_term, queryset), False
+
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
@@ -0,0 +1,153 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+
+from core.cache import single_flight
+from core.db import pin_primary
+
+GENERATION_KEY = "generation:{}"
+PAGE_KEY = "page:{}:{}"
+
+# Области кэша. Посты меняют ленту, группу, профиль автора и свою
+# страницу, а META сбрасывает все ленты разом: названия групп и имена
+# авторов видны в карточках на любой странице.
+INDEX = "index"
+GROUP = "group:{}"
+PROFILE = "profile:{}"
+POST = "post:{}"
+META = "meta"
+
+
+def generations(*scopes):
+    # Текущие поколения областей. Пропавшее из кэша поколение
+    # начинается с текущего времени, чтобы не совпасть со старым.
+    keys = [GENERATION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def bump(*scopes):
+    # Инвалидирует все страницы, закэшированные для этих областей.
+    # Поколение - время изменения в наносекундах.
+    cache.set_many(
+        {GENERATION_KEY.format(scope): time.time_ns() for scope in scopes},
+        None,
+    )
+
+
+def invalidate_post(post):
+    bump(
+        INDEX,
+        PROFILE.format(post.author_id),
+        POST.format(post.pk),
+        *{
+            GROUP.format(group_id)
+            for group_id in (post.group_id, post.loaded_group_id)
+            if group_id is not None
+        },
+    )
+
+
+def consistent(versions, render_response):
+    # Реплики могут еще не видеть недавнюю запись, а страница
+    # запомнится под новым поколением. Такие страницы строим по default.
+    if time.time_ns() - max(versions) < settings.REPLICA_LAG * 10**9:
+        with pin_primary():
+            return render_response()
+    return render_response()
+
+
+def cached_response(request, scopes, render_response, timeout=None):
+    # Кэширует ответ до ближайшей записи в любую из областей.
+    # Шапка страницы зависит от пользователя, поэтому он входит в ключ.
+    key = PAGE_KEY.format(
+        hashlib.md5(request.get_full_path().encode()).hexdigest(),
+        request.user.pk or 0,
+    )
+    versions = generations(*scopes, META)
+
+    def render():
+        # Поколения, по которым построен ответ: из кэша может прийти
+        # устаревший, и conditional не должен выдать его за текущий.
+        response = consistent(versions, render_response)
+        response.cache_versions = versions
+        return response
+
+    return single_flight(
+        key,
+        render,
+        settings.PAGE_CACHE_TIMEOUT if timeout is None else timeout,
+        version=versions,
+        # Редиректы и ошибки не кэшируются.
+        cacheable=lambda response: response.status_code == 200,
+    )
+
+
+def cache_view(scopes=(), timeout=None):
+    # Декоратор для GET-представлений. Области форматируются
+    # именованными аргументами из URL.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            return cached_response(
+                request,
+                [scope.format(**kwargs) for scope in scopes],
+                lambda: view(request, *args, **kwargs),
+                timeout,
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def conditional(get_scopes):
+    """Условный GET: ETag из поколений областей.
+
+    get_scopes(request, **kwargs) возвращает области страницы. Если
+    у клиента актуальная копия, ответ 304 отдается до вызова
+    представления. Last-Modified не отдается: точность в секунду дала
+    бы 304 после записи в ту же секунду. Устаревшая копия из кэша
+    (stale-while-revalidate) уходит без ETag, чтобы клиент не сохранил
+    ее под новым.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            versions = generations(*get_scopes(request, **kwargs), META)
+            etag = quote_etag(
+                hashlib.md5(
+                    f"{request.get_full_path()}:{request.user.pk or 0}:"
+                    f"{versions}".encode()
+                ).hexdigest()
+            )
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = consistent(
+                    versions, lambda: view(request, *args, **kwargs)
+                )
+                if response.status_code != 200:
+                    return response
+                if getattr(response, "cache_versions", versions) == versions:
+                    response["ETag"] = etag
+            # Страница зависит от пользователя.
+            patch_vary_headers(response, ("Cookie",))
+            return response
+
+        return wrapper
+
+    return decorator
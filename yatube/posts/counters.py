@@ -0,0 +1,74 @@
+from django.db.models import Count, F
+
+from .models import Comment, Follow, Post, UserCounters
+
+# Счетчик -> (модель, поле со ссылкой на пользователя)
+SOURCES = {
+    "posts_count": (Post, "author"),
+    "comments_count": (Comment, "author"),
+    "followers_count": (Follow, "author"),
+    "following_count": (Follow, "user"),
+}
+
+
+def recount(user_id):
+    # Пересчитывает счетчики пользователя по исходным таблицам.
+    counters, _ = UserCounters.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            field: model.objects.filter(**{f"{lookup}_id": user_id}).count()
+            for field, (model, lookup) in SOURCES.items()
+        },
+    )
+    return counters
+
+
+def bump(user_id, **deltas):
+    # Атомарно сдвигает счетчики. Строки нет - ее создаст get_counters
+    # или reconcile_counters, здесь не пересчитываем: пользователь может
+    # как раз удаляться.
+    if user_id is None:
+        return
+    UserCounters.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def get_counters(user):
+    try:
+        return user.counters
+    except UserCounters.DoesNotExist:
+        return recount(user.pk)
+
+
+def reconcile():
+    # Сверяет все счетчики с исходными таблицами и чинит расхождения.
+    # Возвращает число исправленных строк.
+    actual = {}
+    for field, (model, lookup) in SOURCES.items():
+        for user_id, total in (
+            model.objects.order_by()
+            .values_list(lookup)
+            .annotate(total=Count("pk"))
+        ):
+            if user_id is not None:
+                actual.setdefault(user_id, {})[field] = total
+    repaired = []
+    for counters in UserCounters.objects.iterator():
+        values = actual.pop(counters.user_id, {})
+        changed = False
+        for field in SOURCES:
+            if getattr(counters, field) != values.get(field, 0):
+                setattr(counters, field, values.get(field, 0))
+                changed = True
+        if changed:
+            repaired.append(counters)
+    UserCounters.objects.bulk_update(repaired, list(SOURCES), batch_size=500)
+    UserCounters.objects.bulk_create(
+        (
+            UserCounters(user_id=user_id, **values)
+            for user_id, values in actual.items()
+        ),
+        batch_size=500,
+    )
+    return len(repaired) + len(actual)
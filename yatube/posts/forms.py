@@ -1,8 +1,40 @@
 from django import forms
+from django.conf import settings
+from PIL import Image
 
 from .models import Comment, Post,Group
 
 
+def check_image(data):
+    # Размер файла и число пикселей проверяются по заголовку, без
+    # декодирования картинки.
+    if (
+        getattr(data, "oversized", False)
+        or data.size > settings.FILE_UPLOAD_MAX_SIZE
+    ):
+        raise forms.ValidationError(
+            "Файл больше %(limit)s МБ.",
+            code="too_large",
+            params={"limit": settings.FILE_UPLOAD_MAX_SIZE // 2**20},
+        )
+    try:
+        with Image.open(data) as image:
+            width, height = image.size
+    except Image.DecompressionBombError:
+        width, height = float("inf"), 1
+    except Exception:
+        # Не картинка - об этом скажет ImageField.
+        width = height = 0
+    finally:
+        data.seek(0)
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise forms.ValidationError(
+            "Картинка больше %(limit)s мегапикселей.",
+            code="too_many_pixels",
+            params={"limit": settings.IMAGE_MAX_PIXELS // 10**6},
+        )
+
+
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
@@ -13,6 +45,21 @@ class PostForm(forms.ModelForm):
             "image": "Изображение",
         }
 
+    def _clean_fields(self):
+        # Лимиты проверяются до ImageField, который декодирует файл
+        # целиком. Отклоненный файл полю не передается: обрезанный
+        # при загрузке, он дал бы еще и ошибку "не картинка".
+        key = self.add_prefix("image")
+        image = self.files.get(key)
+        if image is not None:
+            try:
+                check_image(image)
+            except forms.ValidationError as error:
+                self.add_error("image", error)
+                self.files = self.files.copy()
+                del self.files[key]
+        super()._clean_fields()
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -26,4 +73,18 @@ class GroupForm(forms.ModelForm):
         fields = ('title', 'slug', 'description',)
         prepopulated_fields = {"slug": ("title",)}
         help_text = {'title':'Название группы',
-                    'description':'Описание группы',}
\ No newline at end of file
+                    'description':'Описание группы',}
+
+
+class ExportForm(forms.Form):
+    # Фильтры выгрузки: для команды export и представления export
+    format = forms.ChoiceField(
+        choices=(("ndjson", "NDJSON"), ("csv", "CSV")), required=False
+    )
+    author = forms.CharField(required=False, help_text="Имя пользователя")
+    group = forms.SlugField(required=False, help_text="Идентификатор группы")
+    since = forms.DateField(required=False, help_text="С даты включительно")
+    until = forms.DateField(required=False, help_text="По дату включительно")
+
+    def clean_format(self):
+        return self.cleaned_data["format"] or "ndjson"
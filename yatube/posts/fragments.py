@@ -0,0 +1,56 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template import Context, Engine
+
+from . import caching
+
+CARD_KEY = "card:{}:{}"
+CARD_TEMPLATE = "posts/includes/page_template.html"
+
+
+def cards(posts, group=None):
+    """HTML карточек постов в порядке posts.
+
+    Карточка хранится вместе с поколениями POST своего поста и META,
+    по которым построена: правка поста, переименование группы и смена
+    имени автора делают ее устаревшей. Поколения и карточки страницы
+    читаются одним get_many, недостающие рендерятся и пишутся одним
+    set_many. В группе ссылка на группу не нужна, поэтому карточки
+    там свои.
+    """
+    posts = list(posts)
+    scopes = [caching.META, *(caching.POST.format(post.pk) for post in posts)]
+    stamp_keys = [caching.GENERATION_KEY.format(scope) for scope in scopes]
+    card_keys = [
+        CARD_KEY.format(post.pk, int(group is None)) for post in posts
+    ]
+    found = cache.get_many(stamp_keys + card_keys)
+    if not found.keys() >= set(stamp_keys):
+        # Поколение вытеснено из кэша - заводим заново.
+        found.update(zip(stamp_keys, caching.generations(*scopes)))
+    meta, *post_stamps = (found[key] for key in stamp_keys)
+
+    template = None
+    rendered = {}
+    html = []
+    # Данные постов могли быть прочитаны до свежей правки или с
+    # отстающей реплики: такие карточки рендерим, но не сохраняем.
+    fresh = time.time_ns() - settings.REPLICA_LAG * 10**9
+    for post, stamp, key in zip(posts, post_stamps, card_keys):
+        stamp = (stamp, meta)
+        card = found.get(key)
+        if card is None or card[0] != stamp:
+            if template is None:
+                template = Engine.get_default().get_template(CARD_TEMPLATE)
+            card = (
+                stamp,
+                template.render(Context({"post": post, "group": group})),
+            )
+            if max(stamp) < fresh:
+                rendered[key] = card
+        html.append(card[1])
+    if rendered:
+        cache.set_many(rendered, settings.CARD_CACHE_TIMEOUT)
+    return html
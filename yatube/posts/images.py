@@ -0,0 +1,109 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Count, F
+from PIL import Image
+from sorl.thumbnail import delete
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post, StoredImage
+
+storage = Post._meta.get_field("image").storage
+
+
+def acquire(name, count=1):
+    # Пост (count постов) стал ссылаться на файл.
+    if not name:
+        return
+    if not StoredImage.objects.filter(name=name).update(
+        references=F("references") + count
+    ):
+        StoredImage.objects.create(name=name, references=count)
+
+
+def release(name, count=1):
+    # Пост перестал ссылаться на файл. Файл без ссылок удаляется
+    # вместе с миниатюрами после коммита.
+    if not name:
+        return
+    StoredImage.objects.filter(name=name).update(
+        references=F("references") - count
+    )
+    transaction.on_commit(lambda: collect(name))
+
+
+def hold(name):
+    # Ссылка на время транзакции, в которой файл сохраняется: файл,
+    # найденный среди сохраненных, не удалится, пока пост, который
+    # его получит, не возьмет свою ссылку. Вне транзакции она сразу
+    # снялась бы, поэтому не берется (так копирует картинки import_posts,
+    # ссылки за ним пересчитывает reconcile).
+    if not transaction.get_connection().in_atomic_block:
+        return
+    acquire(name)
+    transaction.on_commit(lambda: release(name))
+
+
+def collect(name):
+    # Удаляет файл, если на него так никто и не сослался и ни один
+    # пост не указывает на него. Файл удаляется до коммита: hold того
+    # же файла ждет блокировки и потом сохранит файл заново.
+    with transaction.atomic():
+        deleted, _ = (
+            StoredImage.objects.filter(name=name, references__lte=0)
+            .exclude(name__in=Post.objects.filter(image=name).values("image"))
+            .delete()
+        )
+        if deleted:
+            delete(ImageFile(name, storage))
+
+
+def reconcile():
+    # Пересчитывает ссылки по постам и удаляет файлы без ссылок.
+    # Нужен после bulk_create, который обходит сигналы. Возвращает
+    # число исправленных строк.
+    actual = dict(
+        Post.objects.exclude(image="")
+        .order_by()
+        .values_list("image")
+        .annotate(total=Count("id"))
+    )
+    fixed = 0
+    for name, references in StoredImage.objects.values_list(
+        "name", "references"
+    ):
+        total = actual.pop(name, 0)
+        if total != references:
+            StoredImage.objects.filter(name=name).update(references=total)
+            fixed += 1
+        if not total:
+            transaction.on_commit(lambda name=name: collect(name))
+    StoredImage.objects.bulk_create(
+        StoredImage(name=name, references=total)
+        for name, total in actual.items()
+    )
+    return fixed + len(actual)
+
+
+def downsample(name):
+    # Уменьшает оригинал, у которого сторона больше
+    # IMAGE_MAX_DIMENSION, и переводит посты на уменьшенный файл.
+    # Возвращает имя, под которым картинка хранится теперь.
+    limit = settings.IMAGE_MAX_DIMENSION
+    with storage.open(name) as file, Image.open(file) as image:
+        if max(image.size) <= limit or getattr(image, "n_frames", 1) > 1:
+            return name
+        format = image.format
+        # JPEG сразу декодируется в уменьшенном масштабе.
+        image.draft(image.mode, (limit, limit))
+        image.thumbnail((limit, limit), Image.LANCZOS)
+        buffer = BytesIO()
+        image.save(buffer, format=format, quality=90)
+    new_name = storage.save(name, ContentFile(buffer.getvalue()))
+    with transaction.atomic():
+        moved = Post.objects.filter(image=name).update(image=new_name)
+        acquire(new_name, moved)
+        release(name, moved)
+    return new_name
@@ -0,0 +1,51 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+
+from posts import caching, thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Строит недостающие миниатюры картинок постов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Число процессов (по умолчанию - по числу ядер)",
+        )
+
+    def handle(self, *args, workers, **options):
+        names = (
+            Post.objects.exclude(image="")
+            .order_by("image")
+            .values_list("image", flat=True)
+            .distinct()
+        )
+        # spawn, а не fork: дочерним процессам нельзя наследовать
+        # открытые соединения с базой и файлом кэша.
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=django.setup,
+        ) as executor:
+            done = failed = 0
+            for name, future in [
+                (name, executor.submit(thumbnails.generate, name))
+                for name in names.iterator()
+            ]:
+                try:
+                    future.result()
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+                else:
+                    done += 1
+        # Закэшированные страницы ссылаются на оригиналы.
+        caching.bump(caching.META)
+        self.stdout.write(f"Готово миниатюр: {done}, ошибок: {failed}")
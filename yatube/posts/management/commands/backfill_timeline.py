@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import Follow, User
+
+
+class Command(BaseCommand):
+    help = "Пересобирает материализованные ленты подписок"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames",
+            nargs="*",
+            help="Пользователи, ленты которых нужно пересобрать "
+            "(по умолчанию - все подписчики)",
+        )
+
+    def handle(self, *args, usernames, **options):
+        if usernames:
+            user_ids = User.objects.filter(
+                username__in=usernames
+            ).values_list("pk", flat=True)
+        else:
+            user_ids = (
+                Follow.objects.order_by("user_id")
+                .values_list("user_id", flat=True)
+                .distinct()
+            )
+        rebuilt = 0
+        for user_id in user_ids.iterator():
+            timeline.rebuild(user_id)
+            rebuilt += 1
+        self.stdout.write(f"Пересобрано лент: {rebuilt}")
@@ -0,0 +1,43 @@
+import random
+import statistics
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+
+from core.instrumentation import Recorder
+from core.template_backends import templates, warm_up
+from posts.management.commands import bench_views
+
+
+class Command(bench_views.Command):
+    help = "Сравнивает время рендеринга страниц с cached.Loader и без него"
+
+    def render_times(self, urls, requests, cached):
+        # Страницы кэшируются в отдельном кэше "bench", который
+        # сбрасывается перед каждым запросом, чтобы шаблон рендерился
+        # каждый раз. Общий кэш не трогаем.
+        with override_settings(
+            TEMPLATES=templates(cached),
+            INSTRUMENTATION_SAMPLE_RATE=0,
+            CACHES=dict(settings.CACHES, default=settings.CACHES["bench"]),
+        ):
+            warm_up()
+            timings = []
+            for _ in range(requests):
+                client, url = random.choice(urls)
+                caches["default"].clear()
+                with Recorder() as recorder:
+                    client.get(url)
+                timings.append(recorder.render_time * 1000)
+        return timings
+
+    def handle(self, *args, requests, **options):
+        random.seed(options["seed"])
+        self.stdout.write(f"{'view':<14}{'без кэша мс':>14}{'с кэшем мс':>13}")
+        for name, urls in self.targets(requests).items():
+            plain, cached = (
+                statistics.median(self.render_times(urls, requests, cached))
+                for cached in (False, True)
+            )
+            self.stdout.write(f"{name:<14}{plain:>14.2f}{cached:>13.2f}")
@@ -0,0 +1,87 @@
+import os
+import random
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, ImageFilter, ImageOps
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from posts.thumbnails import variants
+
+
+def synthetic_corpus(count, seed):
+    # Похожие на фотографии картинки: градиент, пятна и шум.
+    rng = random.Random(seed)
+    for _ in range(count):
+        size = (rng.randint(800, 2400), rng.randint(600, 1800))
+        image = Image.radial_gradient("L").resize(size).convert("RGB")
+        for _ in range(20):
+            x, y = rng.randrange(size[0]), rng.randrange(size[1])
+            radius = rng.randint(20, 300)
+            image.paste(
+                tuple(rng.randrange(256) for _ in range(3)),
+                (x, y, x + radius, y + radius),
+            )
+        noise = Image.effect_noise(size, 40).convert("RGB")
+        yield Image.blend(image, noise, 0.2).filter(
+            ImageFilter.GaussianBlur(2)
+        )
+
+
+def encode(image, format, geometry, options):
+    # Та же обрезка и сжатие, что у sorl для этого варианта.
+    width, height = map(int, geometry.split("x"))
+    thumbnail = ImageOps.fit(image, (width, height), Image.LANCZOS)
+    buffer = BytesIO()
+    thumbnail.save(
+        buffer,
+        format=format,
+        quality=options.get("quality", sorl_settings.THUMBNAIL_QUALITY),
+    )
+    return buffer.tell()
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает размер вариантов миниатюр с одной JPEG-миниатюрой "
+        "960px на выборке картинок"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "corpus",
+            nargs="?",
+            help="Каталог с картинками (по умолчанию - синтетические)",
+        )
+        parser.add_argument("--count", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def load(self, corpus, count):
+        names = sorted(os.listdir(corpus))[:count]
+        if not names:
+            raise CommandError(f"В {corpus} нет картинок")
+        for name in names:
+            with Image.open(os.path.join(corpus, name)) as image:
+                yield image.convert("RGB")
+
+    def handle(self, *args, corpus, count, seed, **options):
+        images = (
+            self.load(corpus, count)
+            if corpus
+            else synthetic_corpus(count, seed)
+        )
+        totals = {}
+        for image in images:
+            for format, width, geometry, variant_options in variants():
+                totals.setdefault((format, width), 0)
+                totals[(format, width)] += encode(
+                    image, format, geometry, variant_options
+                )
+        # Раньше каждому устройству отдавалась основная миниатюра.
+        baseline = next(iter(totals.values()))
+        self.stdout.write(f"{'вариант':<12}{'КБ':>10}{'экономия':>10}")
+        for (format, width), size in totals.items():
+            self.stdout.write(
+                f"{format + ' ' + str(width):<12}{size / 1024:>10.1f}"
+                f"{1 - size / baseline:>10.0%}"
+            )
@@ -0,0 +1,130 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post, User, UserCounters
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагружает ленты через тестовый клиент и выводит перцентили "
+        "задержки и число запросов к базе на страницу"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Запросов на страницу"
+        )
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Очищать кэш перед каждым запросом",
+        )
+        parser.add_argument("--seed", type=int, help="Зерно генератора")
+
+    def sample(self, queryset, size):
+        # Случайные объекты по всему диапазону pk без ORDER BY RANDOM():
+        # для случайного числа берется ближайший pk не меньше него.
+        bounds = queryset.aggregate(low=Min("pk"), high=Max("pk"))
+        if bounds["low"] is None:
+            raise CommandError(
+                "Нет данных для нагрузки, сначала запустите seed"
+            )
+        pks = queryset.order_by("pk").values_list("pk", flat=True)
+        return list(
+            {
+                pks.filter(
+                    pk__gte=random.randint(bounds["low"], bounds["high"])
+                ).first()
+                for _ in range(size)
+            }
+        )
+
+    def client(self, user=None):
+        # Адрес не из INTERNAL_IPS, чтобы не включался debug_toolbar.
+        client = Client(
+            HTTP_HOST=(settings.ALLOWED_HOSTS or ["localhost"])[0],
+            REMOTE_ADDR="192.0.2.1",
+        )
+        if user is not None:
+            client.force_login(user)
+        return client
+
+    def targets(self, count):
+        anonymous = self.client()
+        readers = [
+            self.client(User.objects.get(pk=pk))
+            for pk in self.sample(
+                UserCounters.objects.filter(following_count__gt=0).values(
+                    "user_id"
+                ),
+                10,
+            )
+        ]
+        groups = Group.objects.filter(
+            pk__in=self.sample(Group.objects.all(), count)
+        )
+        authors = User.objects.filter(
+            pk__in=self.sample(
+                UserCounters.objects.filter(posts_count__gt=0).values(
+                    "user_id"
+                ),
+                count,
+            )
+        )
+        return {
+            "index": [(anonymous, reverse("posts:index"))],
+            "group_posts": [
+                (anonymous, reverse("posts:group_list", args=[group.slug]))
+                for group in groups
+            ],
+            "profile": [
+                (anonymous, reverse("posts:profile", args=[author.username]))
+                for author in authors
+            ],
+            "post_detail": [
+                (anonymous, reverse("posts:post_detail", args=[pk]))
+                for pk in self.sample(Post.objects.all(), count)
+            ],
+            "follow_index": [
+                (reader, reverse("posts:follow_index")) for reader in readers
+            ],
+        }
+
+    def handle(self, *args, requests, cold, **options):
+        random.seed(options["seed"])
+        self.stdout.write(
+            f"{'view':<14}{'p50 мс':>9}{'p95 мс':>9}{'p99 мс':>9}"
+            f"{'запросов':>10}"
+        )
+        for name, urls in self.targets(requests).items():
+            timings = []
+            queries = []
+            for _ in range(requests):
+                client, url = random.choice(urls)
+                if cold:
+                    cache.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    timings.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise CommandError(f"{url}: {response.status_code}")
+                queries.append(len(captured))
+            p50, p95, p99 = (
+                statistics.quantiles(timings, n=100)[index] * 1000
+                for index in (49, 94, 98)
+            )
+            self.stdout.write(
+                f"{name:<14}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}"
+                f"{statistics.mean(queries):>10.1f}"
+            )
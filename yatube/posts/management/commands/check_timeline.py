@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import timeline
+from posts.models import Follow, Timeline
+
+
+class Command(BaseCommand):
+    help = "Сверяет материализованные ленты подписок с подписками"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Пересобрать ленты, в которых найдены расхождения",
+        )
+
+    def handle(self, *args, fix, **options):
+        user_ids = set(
+            Follow.objects.values_list("user_id", flat=True).distinct()
+        ) | set(
+            Timeline.objects.order_by()
+            .values_list("user_id", flat=True)
+            .distinct()
+        )
+        broken = 0
+        for user_id in sorted(user_ids):
+            missing, extra = timeline.check(user_id)
+            if not missing and not extra:
+                continue
+            broken += 1
+            self.stdout.write(
+                f"Пользователь {user_id}: пропущено {len(missing)}, "
+                f"лишних {len(extra)}"
+            )
+            if fix:
+                timeline.rebuild(user_id)
+        if broken and not fix:
+            raise CommandError(f"Лент с расхождениями: {broken}")
+        self.stdout.write(f"Проверено лент: {len(user_ids)}")
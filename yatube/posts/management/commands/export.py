@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import FIELDS, export
+from posts.forms import ExportForm
+
+
+class Command(BaseCommand):
+    help = "Выгружает посты или комментарии в NDJSON или CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=list(FIELDS))
+        parser.add_argument(
+            "--format", choices=("ndjson", "csv"), default="ndjson"
+        )
+        parser.add_argument("--author", help="Имя пользователя автора")
+        parser.add_argument("--group", help="Идентификатор группы")
+        parser.add_argument("--since", help="С даты (ГГГГ-ММ-ДД)")
+        parser.add_argument("--until", help="По дату (ГГГГ-ММ-ДД)")
+        parser.add_argument(
+            "--output", help="Файл для выгрузки (по умолчанию - stdout)"
+        )
+
+    def handle(self, *args, kind, output, **options):
+        form = ExportForm(options)
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+        lines = export(kind, **form.cleaned_data)
+        if output is None:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        with open(output, "w", encoding="utf-8", newline="") as file:
+            file.writelines(lines)
@@ -0,0 +1,227 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils._os import safe_join
+from django.utils.dateparse import parse_datetime
+
+from posts import caching, counters, images, timeline
+from posts.models import Group, Post, User
+from posts.utils import batched, bulk_insert
+
+FORMATS = (".ndjson", ".csv")
+# Значений в одном условии IN при поиске уже загруженных постов
+LOOKUP_BATCH_SIZE = 500
+
+
+def read(path):
+    # Строки выгрузки (см. команду export) как словари.
+    with open(path, encoding="utf-8", newline="") as file:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(file)
+            return
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def locate(path, name):
+    # name.ndjson или name.csv в каталоге выгрузки.
+    for extension in FORMATS:
+        candidate = os.path.join(path, name + extension)
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает посты, группы и картинки из выгрузки в NDJSON или CSV. "
+        "Авторы ищутся по имени пользователя, группы - по slug. Пост, "
+        "у автора которого уже есть пост с той же датой, не загружается "
+        "повторно"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            help=(
+                "Файл постов или каталог с posts.ndjson/posts.csv "
+                "и необязательным groups.ndjson/groups.csv"
+            ),
+        )
+        parser.add_argument(
+            "--images",
+            dest="images_dir",
+            help="Каталог картинок (по умолчанию - каталог выгрузки)",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Потоков для копирования картинок",
+        )
+
+    def handle(self, *args, path, images_dir, batch_size, workers, **options):
+        if os.path.isdir(path):
+            posts_path = locate(path, "posts")
+            groups_path = locate(path, "groups")
+        else:
+            posts_path, groups_path = path, None
+        if posts_path is None or not posts_path.endswith(FORMATS):
+            raise CommandError(f"Не найден файл постов в {path}")
+        self.images_dir = images_dir or os.path.dirname(posts_path)
+        self.stored = {}
+        # Справочники в памяти: ни одного запроса на строку.
+        self.authors = dict(User.objects.values_list("username", "pk"))
+        self.groups = dict(Group.objects.values_list("slug", "pk"))
+
+        started = time.monotonic()
+        if groups_path is not None:
+            self.create_groups(read(groups_path))
+        created = skipped = existing = 0
+        authors = set()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch in batched(read(posts_path), batch_size):
+                entries, missing, loaded = self.new_rows(batch)
+                skipped += missing
+                existing += loaded
+                posts = self.build(entries, executor)
+                with transaction.atomic():
+                    # Строки с id и без него вставляются отдельно:
+                    # bulk_insert пишет pk, только если он задан у всех.
+                    for exported in (True, False):
+                        bulk_insert(
+                            Post,
+                            [
+                                post
+                                for post in posts
+                                if (post.pk is not None) == exported
+                            ],
+                        )
+                created += len(posts)
+                authors.update(post.author_id for post in posts)
+                self.stdout.write(f"\rПостов: {created}", ending="")
+        self.stdout.write("")
+
+        # bulk_create обходит сигналы: счетчики, ленты и кэш страниц
+        # приводим в порядок отдельно. Ленты - только у подписчиков
+        # авторов загруженных постов.
+        counters.reconcile()
+        images.reconcile()
+        timeline.rebuild_authors(sorted(authors))
+        caching.bump(caching.INDEX, caching.META)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"Загружено постов: {created} за {elapsed:.1f} с "
+            f"({created / elapsed * 60:.0f} в минуту), "
+            f"пропущено с неизвестным автором: {skipped}, "
+            f"загруженных ранее: {existing}"
+        )
+
+    def new_rows(self, rows):
+        # (строка, автор, дата) еще не загруженных строк пачки, число
+        # строк с неизвестным автором и число загруженных ранее.
+        # Загруженной считается строка, у автора которой уже есть пост
+        # с той же датой публикации: по id этого не понять, в другой
+        # базе те же id у чужих постов.
+        entries = []
+        for row in rows:
+            author_id = self.authors.get(row["author"])
+            if author_id is None:
+                continue
+            pub_date = parse_datetime(row.get("pub_date") or "")
+            if pub_date is None:
+                pub_date = timezone.now()
+            elif timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date)
+            entries.append((row, author_id, pub_date))
+        loaded = set()
+        for chunk in batched(entries, LOOKUP_BATCH_SIZE):
+            loaded.update(
+                Post.objects.filter(
+                    author_id__in={author_id for _, author_id, _ in chunk},
+                    pub_date__in={pub_date for _, _, pub_date in chunk},
+                ).values_list("author_id", "pub_date")
+            )
+        new = [
+            entry for entry in entries if (entry[1], entry[2]) not in loaded
+        ]
+        return new, len(rows) - len(entries), len(entries) - len(new)
+
+    def create_groups(self, rows):
+        with transaction.atomic():
+            Group.objects.bulk_create(
+                (
+                    Group(
+                        slug=row["slug"],
+                        title=row.get("title") or row["slug"],
+                        description=row.get("description") or "",
+                    )
+                    for row in rows
+                    if row["slug"] not in self.groups
+                ),
+                ignore_conflicts=True,
+            )
+        self.groups = dict(Group.objects.values_list("slug", "pk"))
+
+    def copy_image(self, name):
+        # Копирует картинку в хранилище, возвращает имя в нем.
+        # Одинаковые картинки хранилище сохранит одним файлом.
+        try:
+            source = safe_join(self.images_dir, name)
+        except SuspiciousFileOperation:
+            source = None
+        if source is None or not os.path.isfile(source):
+            self.stderr.write(f"Нет картинки: {name}")
+            return ""
+        with open(source, "rb") as file:
+            return images.storage.save(name, File(file))
+
+    def build(self, entries, executor):
+        # Посты пачки. Недостающие группы создаются по slug, картинки
+        # копируются параллельно. Пост сохраняет id из выгрузки, если
+        # он свободен, иначе получает новый.
+        rows = [row for row, _, _ in entries]
+        slugs = {row.get("group") for row in rows} - {None, ""}
+        if not slugs <= self.groups.keys():
+            self.create_groups({"slug": slug} for slug in slugs)
+        names = list(
+            {row.get("image") for row in rows} - {None, ""} - set(self.stored)
+        )
+        self.stored.update(zip(names, executor.map(self.copy_image, names)))
+
+        taken = set()
+        for chunk in batched(
+            {int(row["id"]) for row in rows if row.get("id")},
+            LOOKUP_BATCH_SIZE,
+        ):
+            taken.update(
+                Post.objects.filter(pk__in=chunk).values_list("pk", flat=True)
+            )
+        posts = []
+        for row, author_id, pub_date in entries:
+            pk = int(row["id"]) if row.get("id") else None
+            if pk in taken:
+                pk = None
+            elif pk is not None:
+                taken.add(pk)
+            posts.append(
+                Post(
+                    id=pk,
+                    author_id=author_id,
+                    group_id=self.groups.get(row.get("group")),
+                    text=row["text"],
+                    pub_date=pub_date,
+                    image=self.stored.get(row.get("image"), ""),
+                )
+            )
+        return posts
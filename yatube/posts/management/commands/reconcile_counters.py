@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет счетчики пользователей с постами, комментариями "
+        "и подписками и исправляет расхождения"
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Исправлено счетчиков: {reconcile()}")
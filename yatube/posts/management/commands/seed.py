@@ -0,0 +1,168 @@
+import random
+import secrets
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from posts import caching, counters, timeline
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import batched, bulk_insert
+
+WORDS = (
+    "пост лента группа автор подписка комментарий новость день город "
+    "кошка собака погода книга фильм музыка проект код база запрос кэш"
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу синтетическими пользователями, группами, постами, "
+        "комментариями и подписками со степенным распределением"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--groups", type=int, default=50)
+        parser.add_argument("--posts", type=int, default=10000)
+        parser.add_argument("--comments", type=int, default=20000)
+        parser.add_argument(
+            "--follows",
+            type=int,
+            default=20,
+            help="Среднее число подписок пользователя",
+        )
+        parser.add_argument(
+            "--zipf",
+            type=float,
+            default=1.1,
+            help="Показатель степенного распределения популярности",
+        )
+        parser.add_argument(
+            "--days", type=int, default=365, help="Глубина истории, дней"
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, help="Зерно генератора")
+
+    def create(self, model, objects, ignore_conflicts=False):
+        # Возвращает pk созданных строк: SQLite не отдает их
+        # из bulk_create. Даты публикации пишутся как заданы.
+        last_pk = model.objects.aggregate(last=Max("pk"))["last"] or 0
+        created = 0
+        for batch in batched(objects, self.batch_size):
+            with transaction.atomic():
+                bulk_insert(model, batch, ignore_conflicts=ignore_conflicts)
+            created += len(batch)
+            self.stdout.write(
+                f"\r{model._meta.verbose_name_plural}: {created}", ending=""
+            )
+        self.stdout.write("")
+        return list(
+            model.objects.filter(pk__gt=last_pk).values_list("pk", flat=True)
+        )
+
+    def text(self, low, high):
+        return " ".join(random.choices(WORDS, k=random.randint(low, high)))
+
+    def date(self):
+        return self.now - timedelta(seconds=random.random() * self.history)
+
+    def popular(self, population, cum_weights, k=1):
+        return random.choices(population, cum_weights=cum_weights, k=k)
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.now = timezone.now()
+        self.history = options["days"] * 24 * 60 * 60
+        run = secrets.token_hex(3)
+        password = make_password(None)
+
+        user_ids = self.create(
+            User,
+            (
+                User(
+                    username=f"seed_{run}_{i}",
+                    first_name=random.choice(WORDS).title(),
+                    password=password,
+                )
+                for i in range(options["users"])
+            ),
+        )
+        group_ids = self.create(
+            Group,
+            (
+                Group(
+                    title=f"Группа {run} {i}",
+                    slug=f"seed-{run}-{i}",
+                    description=self.text(5, 20),
+                )
+                for i in range(options["groups"])
+            ),
+        )
+        # Популярность по закону Ципфа: i-й по популярности автор
+        # (пост) весит 1 / i^zipf. Пишут все примерно поровну, иначе
+        # ленты подписчиков самых популярных авторов раздуваются.
+        zipf = options["zipf"]
+        groups = group_ids + [None]
+        user_weights = list(
+            accumulate(1 / (i + 1) ** zipf for i in range(len(user_ids)))
+        )
+        post_ids = self.create(
+            Post,
+            (
+                Post(
+                    author_id=random.choice(user_ids),
+                    group_id=random.choice(groups),
+                    text=self.text(5, 60),
+                    pub_date=self.date(),
+                )
+                for _ in range(options["posts"])
+            ),
+        )
+        post_weights = list(
+            accumulate(1 / (i + 1) ** zipf for i in range(len(post_ids)))
+        )
+        self.create(
+            Comment,
+            (
+                Comment(
+                    post_id=post_id,
+                    author_id=random.choice(user_ids),
+                    text=self.text(2, 20),
+                    pub_date=self.date(),
+                )
+                for post_id in self.popular(
+                    post_ids, post_weights, options["comments"]
+                )
+            ),
+        )
+        self.create(
+            Follow,
+            (
+                Follow(user_id=user_id, author_id=author_id)
+                for user_id in user_ids
+                for author_id in set(
+                    self.popular(
+                        user_ids,
+                        user_weights,
+                        int(random.expovariate(1 / options["follows"]))
+                        if options["follows"]
+                        else 0,
+                    )
+                )
+                if author_id != user_id
+            ),
+            ignore_conflicts=True,
+        )
+
+        # bulk_create обходит сигналы: счетчики, ленты и кэш страниц
+        # приводим в порядок отдельно.
+        self.stdout.write(f"Исправлено счетчиков: {counters.reconcile()}")
+        timeline.rebuild_all()
+        caching.bump(caching.INDEX, caching.META)
+        self.stdout.write("Готово")
@@ -0,0 +1,84 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("posts", "0012_auto_20221021_2004"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Timeline",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "pub_date",
+                    models.DateTimeField(verbose_name="Дата публикации"),
+                ),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="автор",
+                    ),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeline_entries",
+                        to="posts.Post",
+                        verbose_name="пост",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeline",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Запись ленты",
+                "verbose_name_plural": "Записи ленты",
+                "ordering": ("-pub_date",),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="timeline",
+            index=models.Index(
+                fields=["user", "-pub_date"], name="timeline_user_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timeline",
+            index=models.Index(
+                fields=["user", "author"], name="timeline_user_author_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="timeline",
+            constraint=models.UniqueConstraint(
+                fields=("user", "post"), name="unique_timeline_post"
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0011_update_proxy_permissions"),
+        ("posts", "0013_timeline"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserCounters",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="counters",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="пользователь",
+                    ),
+                ),
+                (
+                    "posts_count",
+                    models.IntegerField(default=0, verbose_name="Постов"),
+                ),
+                (
+                    "comments_count",
+                    models.IntegerField(
+                        default=0, verbose_name="Комментариев"
+                    ),
+                ),
+                (
+                    "followers_count",
+                    models.IntegerField(
+                        db_index=True, default=0, verbose_name="Подписчиков"
+                    ),
+                ),
+                (
+                    "following_count",
+                    models.IntegerField(default=0, verbose_name="Подписок"),
+                ),
+            ],
+            options={
+                "verbose_name": "Счетчики пользователя",
+                "verbose_name_plural": "Счетчики пользователей",
+            },
+        ),
+    ]
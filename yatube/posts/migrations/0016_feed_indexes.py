@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0015_post_fts"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "-pub_date"], name="comment_post_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="follow",
+            index=models.Index(
+                fields=["author", "user"], name="follow_author_user_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["group", "-pub_date", "-id"],
+                name="post_group_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="post_author_date_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0016_feed_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="comment",
+            name="comment_post_date_idx",
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "-pub_date", "-id"],
+                name="comment_post_date_idx",
+            ),
+        ),
+    ]
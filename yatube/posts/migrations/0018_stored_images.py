@@ -0,0 +1,52 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:35
+
+import core.storage_backends
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_references(apps, schema_editor):
+    # Ссылки на уже загруженные картинки. Старые файлы остаются
+    # под прежними именами и тоже удаляются с последней ссылкой.
+    Post = apps.get_model("posts", "Post")
+    StoredImage = apps.get_model("posts", "StoredImage")
+    StoredImage.objects.bulk_create(
+        StoredImage(name=row["image"], references=row["total"])
+        for row in Post.objects.exclude(image="")
+        .order_by()
+        .values("image")
+        .annotate(total=Count("id"))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_comment_cursor_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Файл')),
+                ('references', models.IntegerField(default=0, verbose_name='Ссылок')),
+            ],
+            options={
+                'verbose_name': 'Файл картинки',
+                'verbose_name_plural': 'Файлы картинок',
+            },
+        ),
+        # Хранилище не меняет схему, а AlterField в SQLite пересоздал бы
+        # таблицу постов вместе с триггерами полнотекстового индекса.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='post',
+                    name='image',
+                    field=models.ImageField(blank=True, help_text='Загрузите свою картинку', storage=core.storage_backends.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+                ),
+            ],
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_celebrities(apps, schema_editor):
+    # Ленты построены по порогу: его и фиксируем.
+    UserCounters = apps.get_model("posts", "UserCounters")
+    UserCounters.objects.filter(
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).update(is_celebrity=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0018_stored_images"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="timeline",
+            name="timeline_user_date_idx",
+        ),
+        migrations.AddField(
+            model_name="usercounters",
+            name="is_celebrity",
+            field=models.BooleanField(
+                db_index=True, default=False, verbose_name="Популярный автор"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timeline",
+            index=models.Index(
+                fields=["user", "-pub_date", "-post"],
+                name="timeline_user_date_post_idx",
+            ),
+        ),
+        migrations.RunPython(mark_celebrities, migrations.RunPython.noop),
+    ]
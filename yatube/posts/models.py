@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.storage_backends import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -20,6 +22,21 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        # Только то, что нужно карточке поста в ленте, одним запросом.
+        return self.select_related("author", "group").only(
+            "text",
+            "pub_date",
+            "image",
+            "author__username",
+            "author__first_name",
+            "author__last_name",
+            "group__slug",
+            "group__title",
+        )
+
+
 class Post(models.Model):
     # Модель для поста
     text = models.TextField(
@@ -46,12 +63,27 @@ class Post(models.Model):
     image = models.ImageField(
         "Картинка",
         upload_to="posts/",
+        storage=ContentAddressedStorage(),
         blank=True,
         help_text="Загрузите свою картинку",
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ("-pub_date",)
+        # id входит в индексы, потому что курсорная пагинация сортирует
+        # по (pub_date, id): иначе SQLite досортировывает страницу.
+        indexes = [
+            models.Index(
+                fields=["group", "-pub_date", "-id"],
+                name="post_group_date_idx",
+            ),
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="post_author_date_idx",
+            ),
+        ]
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
 
@@ -59,6 +91,14 @@ class Post(models.Model):
         return self.text[:15]
 
 
+class CommentQuerySet(models.QuerySet):
+    def for_feed(self):
+        # Текст комментария и имя автора одним запросом.
+        return self.select_related("author").only(
+            "text", "pub_date", "post_id", "author__username"
+        )
+
+
 class Comment(models.Model):
     # Модель для комментария
     text = models.TextField(
@@ -83,8 +123,16 @@ class Comment(models.Model):
         verbose_name="Автор",
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ("-pub_date",)
+        indexes = [
+            models.Index(
+                fields=["post", "-pub_date", "-id"],
+                name="comment_post_date_idx",
+            ),
+        ]
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
 
@@ -112,8 +160,102 @@ class Follow(models.Model):
                 fields=["user", "author"], name="unique_following"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["author", "user"], name="follow_author_user_idx"
+            ),
+        ]
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
 
     def __str__(self):
         return f"{self.user.username}-{self.author.username}"
+
+
+class Timeline(models.Model):
+    # Материализованная лента подписок: пост, разосланный подписчику
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+        verbose_name="пользователь",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        verbose_name="пост",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="автор",
+    )
+    pub_date = models.DateTimeField(verbose_name="Дата публикации")
+
+    class Meta:
+        ordering = ("-pub_date",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_timeline_post"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-post"],
+                name="timeline_user_date_post_idx",
+            ),
+            models.Index(
+                fields=["user", "author"], name="timeline_user_author_idx"
+            ),
+        ]
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+
+    def __str__(self):
+        return f"{self.user_id}-{self.post_id}"
+
+
+class UserCounters(models.Model):
+    # Денормализованные счетчики пользователя для профиля и поста
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="counters",
+        verbose_name="пользователь",
+    )
+    posts_count = models.IntegerField("Постов", default=0)
+    comments_count = models.IntegerField("Комментариев", default=0)
+    followers_count = models.IntegerField(
+        "Подписчиков", default=0, db_index=True
+    )
+    following_count = models.IntegerField("Подписок", default=0)
+    # Посты автора не рассылаются, а подмешиваются в ленту при чтении
+    # (posts.timeline). Меняется вместе с записями лент подписчиков.
+    is_celebrity = models.BooleanField(
+        "Популярный автор", default=False, db_index=True
+    )
+
+    class Meta:
+        verbose_name = "Счетчики пользователя"
+        verbose_name_plural = "Счетчики пользователей"
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class StoredImage(models.Model):
+    # Файл картинки и число постов, которые на него ссылаются.
+    # Одинаковые загрузки хранятся одним файлом, он удаляется вместе
+    # с последней ссылкой.
+    name = models.CharField("Файл", max_length=100, primary_key=True)
+    references = models.IntegerField("Ссылок", default=0)
+
+    class Meta:
+        verbose_name = "Файл картинки"
+        verbose_name_plural = "Файлы картинок"
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,36 @@
+import re
+
+from django.db import connection
+
+from .models import Post
+
+FTS_TABLE = "posts_post_fts"
+
+
+def terms(query):
+    return re.findall(r"\w+", query.lower())
+
+
+def to_match(query):
+    # Запрос пользователя -> выражение FTS5: все слова обязательны,
+    # каждое ищется по префиксу. Кавычки экранируют синтаксис FTS5.
+    return " ".join(f'"{term}"*' for term in terms(query))
+
+
+def search(query, queryset=None):
+    # Посты с подходящим текстом, самые релевантные (bm25) первыми.
+    if queryset is None:
+        queryset = Post.objects.for_feed()
+    words = terms(query)
+    if not words:
+        return queryset.none()
+    if connection.vendor != "sqlite":
+        for word in words:
+            queryset = queryset.filter(text__icontains=word)
+        return queryset
+    return queryset.extra(
+        select={"rank": f"{FTS_TABLE}.rank"},
+        tables=[FTS_TABLE],
+        where=[f"{FTS_TABLE}.rowid = posts_post.id", f"{FTS_TABLE} MATCH %s"],
+        params=[to_match(query)],
+    ).order_by("rank", "-pub_date")
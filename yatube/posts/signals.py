@@ -0,0 +1,133 @@
+from django.db.models.signals import (
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core.storage_backends import ContentAddressedStorage, content_saving
+
+from . import caching, images, thumbnails, timeline
+from .counters import bump
+from .models import Comment, Follow, Group, Post, User, UserCounters
+
+# Поля пользователя, которые видны в карточках постов
+USER_DISPLAY_FIELDS = {"username", "first_name", "last_name"}
+
+
+@receiver(post_save, sender=User)
+def create_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserCounters.objects.create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields and not USER_DISPLAY_FIELDS & update_fields):
+        return
+    caching.bump(caching.META)
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    # Прежняя группа нужна, чтобы сбросить кэш обеих групп при переносе.
+    # __dict__ - чтобы не загружать отложенное поле.
+    instance.loaded_group_id = instance.__dict__.get("group_id")
+    instance.loaded_image = str(instance.__dict__.get("image") or "")
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.author_id, posts_count=1)
+        timeline.fan_out(instance)
+    caching.invalidate_post(instance)
+    instance.loaded_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Post)
+def track_image(sender, instance, raw=False, **kwargs):
+    # Считаем ссылки на файлы картинок: прежний файл удаляется, когда
+    # на него больше никто не ссылается. Новую картинку уменьшаем
+    # в фоне, а не в первом запросе к ленте.
+    image = str(instance.__dict__.get("image") or "")
+    if raw or image == instance.loaded_image:
+        return
+    images.acquire(image)
+    images.release(instance.loaded_image)
+    thumbnails.schedule(image)
+    instance.loaded_image = image
+
+
+@receiver(content_saving, sender=ContentAddressedStorage)
+def hold_image(sender, name, **kwargs):
+    images.hold(name)
+
+
+@receiver(pre_delete, sender=Post)
+def load_image(sender, instance, **kwargs):
+    # Отложенные поля дочитываем, пока строка поста еще есть: после
+    # удаления их не загрузить, а без картинки ссылка на файл
+    # не освободится.
+    deferred = instance.get_deferred_fields()
+    if deferred:
+        instance.refresh_from_db(fields=deferred)
+        instance.loaded_image = instance.image.name
+
+
+@receiver(post_delete, sender=Post)
+def forget_post(sender, instance, **kwargs):
+    bump(instance.author_id, posts_count=-1)
+    images.release(instance.loaded_image)
+    caching.invalidate_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.author_id, comments_count=1)
+        caching.bump(
+            caching.PROFILE.format(instance.author_id),
+            caching.POST.format(instance.post_id),
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def forget_comment(sender, instance, **kwargs):
+    bump(instance.author_id, comments_count=-1)
+    caching.bump(
+        caching.PROFILE.format(instance.author_id),
+        caching.POST.format(instance.post_id),
+    )
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.author_id, followers_count=1)
+        bump(instance.user_id, following_count=1)
+        timeline.update_status(instance.author_id)
+        timeline.follow(instance.user_id, instance.author_id)
+        caching.bump(
+            caching.PROFILE.format(instance.author_id),
+            caching.PROFILE.format(instance.user_id),
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def clean_timeline(sender, instance, **kwargs):
+    bump(instance.author_id, followers_count=-1)
+    bump(instance.user_id, following_count=-1)
+    timeline.unfollow(instance.user_id, instance.author_id)
+    timeline.update_status(instance.author_id)
+    caching.bump(
+        caching.PROFILE.format(instance.author_id),
+        caching.PROFILE.format(instance.user_id),
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    caching.bump(caching.META)
@@ -1,3 +1,4 @@
+import hashlib
 import tempfile
 from http import HTTPStatus
 
@@ -20,6 +21,7 @@ POST_CREATE = reverse("posts:post_create")
 GROUP_LIST = reverse("posts:group_list", args=[TEST_SLUG])
 GROUP_LIST_2 = reverse("posts:group_list", args=[TEST_SLUG_2])
 PROFILE = reverse("posts:profile", args=[TEST_USER])
+SEARCH = reverse("posts:search")
 LOGIN = reverse("users:login")
 NEXT = "?next="
 REDIRECT_POST_CREATE = f"{LOGIN}{NEXT}{POST_CREATE}"
@@ -49,4 +51,7 @@ TEST_PICTURE_2 = SimpleUploadedFile(
     content_type="image/png",
 )
 IMAGE_FOLDER = Post._meta.get_field("image").upload_to
+# Картинки хранятся под хэшем содержимого
+IMAGE_HASH = hashlib.sha256(IMAGE).hexdigest()
+IMAGE_NAME = f"{IMAGE_FOLDER}{IMAGE_HASH[:2]}/{IMAGE_HASH[2:]}.png"
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
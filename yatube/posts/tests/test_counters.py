@@ -0,0 +1,58 @@
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..counters import get_counters
+from ..models import Comment, Follow, Post, User, UserCounters
+
+
+class UserCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="author")
+        cls.user_2 = User.objects.create_user(username="reader")
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Счетчики меняются при создании и удалении объектов."""
+        post = Post.objects.create(author=self.user, text="Пост")
+        comment = Comment.objects.create(
+            post=post, author=self.user, text="Комментарий"
+        )
+        follow = Follow.objects.create(user=self.user_2, author=self.user)
+        counters = self.counters(self.user)
+        self.assertEqual(counters.posts_count, 1)
+        self.assertEqual(counters.comments_count, 1)
+        self.assertEqual(counters.followers_count, 1)
+        self.assertEqual(self.counters(self.user_2).following_count, 1)
+        comment.delete()
+        follow.delete()
+        post.delete()
+        counters = self.counters(self.user)
+        self.assertEqual(counters.posts_count, 0)
+        self.assertEqual(counters.comments_count, 0)
+        self.assertEqual(counters.followers_count, 0)
+        self.assertEqual(self.counters(self.user_2).following_count, 0)
+
+    def test_reconcile_repairs_drift(self):
+        """reconcile_counters исправляет расхождения и создает
+        недостающие счетчики."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f"Пост {i}") for i in range(3)
+        )
+        UserCounters.objects.filter(user=self.user_2).delete()
+        Follow.objects.create(user=self.user_2, author=self.user)
+        call_command("reconcile_counters")
+        counters = self.counters(self.user)
+        self.assertEqual(counters.posts_count, 3)
+        self.assertEqual(counters.followers_count, 1)
+        self.assertEqual(self.counters(self.user_2).following_count, 1)
+
+    def test_get_counters_creates_missing(self):
+        """get_counters пересчитывает счетчики, если строки нет."""
+        Post.objects.create(author=self.user, text="Пост")
+        UserCounters.objects.all().delete()
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(get_counters(user).posts_count, 1)
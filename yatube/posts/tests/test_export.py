@@ -0,0 +1,94 @@
+import csv
+import json
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Group, Post, User
+
+EXPORT_POSTS = reverse("posts:export", args=["posts"])
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="export_author")
+        cls.other = User.objects.create_user(username="export_other")
+        cls.group = Group.objects.create(
+            slug="export_group", title="Группа", description="Описание"
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text="Пост, с запятой"
+        )
+        cls.old_post = Post.objects.create(author=cls.other, text="Старый")
+        Post.objects.filter(pk=cls.old_post.pk).update(
+            pub_date=timezone.now() - timedelta(days=30)
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.other, text="Комментарий"
+        )
+        cls.staff = Client()
+        cls.staff.force_login(
+            User.objects.create_user(username="moderator", is_staff=True)
+        )
+
+    def export(self, *args):
+        out = StringIO()
+        call_command("export", *args, stdout=out)
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_command_filters(self):
+        """Команда export выгружает NDJSON с фильтрами."""
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        cases = (
+            ((), [self.post.pk, self.old_post.pk]),
+            (("--author=export_other",), [self.old_post.pk]),
+            (("--group=export_group",), [self.post.pk]),
+            ((f"--since={since}",), [self.post.pk]),
+            ((f"--until={since}",), [self.old_post.pk]),
+        )
+        for args, expected in cases:
+            with self.subTest(args=args):
+                self.assertEqual(
+                    [row["id"] for row in self.export("posts", *args)],
+                    expected,
+                )
+        row = self.export("posts", "--group=export_group")[0]
+        self.assertEqual(row["author"], "export_author")
+        self.assertEqual(row["pub_date"], self.post.pub_date.isoformat())
+        comments = self.export("comments", "--group=export_group")
+        self.assertEqual(comments[0]["post"], self.post.pk)
+
+    def test_view_streams_csv(self):
+        """Представление отдает CSV потоком."""
+        response = self.staff.get(
+            EXPORT_POSTS, {"format": "csv", "author": "export_author"}
+        )
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(
+            csv.DictReader(
+                b"".join(response.streaming_content).decode().splitlines()
+            )
+        )
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["text"], self.post.text)
+
+    def test_view_access_and_errors(self):
+        """Выгрузка только для персонала, ошибки фильтров - 400."""
+        user = Client()
+        user.force_login(self.author)
+        self.assertEqual(user.get(EXPORT_POSTS).status_code, HTTPStatus.FOUND)
+        cases = (
+            (EXPORT_POSTS + "?since=bad", HTTPStatus.BAD_REQUEST),
+            (reverse("posts:export", args=["users"]), HTTPStatus.NOT_FOUND),
+        )
+        for url, expected in cases:
+            with self.subTest(url=url):
+                self.assertEqual(self.staff.get(url).status_code, expected)
@@ -3,12 +3,14 @@ import tempfile
 
 from django import forms
 from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from ..models import Comment, Group, Post, User
 from .constant import (
-    IMAGE_FOLDER,
+    IMAGE,
+    IMAGE_NAME,
     LOGIN,
     NEXT,
     POST_CREATE,
@@ -81,9 +83,7 @@ class PostFormsTest(TestCase):
         self.assertEqual(post.text, form_data["text"])
         self.assertEqual(post.group_id, form_data["group"])
         self.assertEqual(post.author, self.user)
-        self.assertEqual(
-            post.image.name, f'{IMAGE_FOLDER}{form_data["image"].name}'
-        )
+        self.assertEqual(post.image.name, IMAGE_NAME)
 
     def test_edit_post(self):
         """Валидная форма редактирует запись в Post."""
@@ -102,9 +102,38 @@ class PostFormsTest(TestCase):
         self.assertEqual(post.text, form_data["text"])
         self.assertEqual(post.group_id, form_data["group"])
         self.assertEqual(post.author, self.post.author)
-        self.assertEqual(
-            post.image.name, f'{IMAGE_FOLDER}{form_data["image"].name}'
+        self.assertEqual(post.image.name, IMAGE_NAME)
+
+    def test_image_limits(self):
+        """Слишком большой файл или картинка отклоняются формой."""
+        Post.objects.all().delete()
+        cases = (
+            ({"FILE_UPLOAD_MAX_SIZE": 10}, "Файл больше"),
+            ({"IMAGE_MAX_PIXELS": 1}, "мегапикселей"),
         )
+        for limits, error in cases:
+            with self.subTest(limits=limits), override_settings(**limits):
+                response = self.authorized_client.post(
+                    POST_CREATE,
+                    {
+                        "text": "Пост",
+                        "image": SimpleUploadedFile("pic.png", IMAGE),
+                    },
+                )
+                # Отклоненный файл ImageField уже не проверяет.
+                errors = response.context["form"].errors["image"]
+                self.assertEqual(len(errors), 1)
+                self.assertIn(error, errors[0])
+                self.assertFalse(Post.objects.exists())
+
+    def test_upload_csrf(self):
+        """Представления с ограниченной загрузкой проверяют CSRF."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        post_count = Post.objects.count()
+        response = client.post(POST_CREATE, {"text": "Пост"})
+        self.assertTemplateUsed(response, "core/403csrf.html")
+        self.assertEqual(Post.objects.count(), post_count)
 
     def test_creat_post_correct_context(self):
         urls = (self.POST_EDIT, POST_CREATE)
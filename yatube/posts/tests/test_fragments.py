@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .. import fragments
+from ..models import Group, Post, User
+
+
+@override_settings(REPLICA_LAG=0)
+class PostCardsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username="card_author", first_name="Иван"
+        )
+        cls.group = Group.objects.create(
+            slug="cards", title="Группа", description="Описание"
+        )
+        for i in range(3):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f"Пост {i}"
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def cards(self, group=None):
+        return fragments.cards(Post.objects.for_feed(), group)
+
+    def test_cached(self):
+        """Карточки рендерятся один раз и читаются одним get_many."""
+        first = self.cards()
+        with mock.patch.object(
+            fragments.Engine, "get_default"
+        ) as get_default, mock.patch.object(
+            fragments.cache, "get_many", wraps=cache.get_many
+        ) as get_many:
+            self.assertEqual(self.cards(), first)
+        get_default.assert_not_called()
+        get_many.assert_called_once()
+        self.assertIn("Группа", first[0])
+        self.assertNotIn("Группа", self.cards(self.group)[0])
+
+    def test_invalidation(self):
+        """Правка поста, группы и имени автора обновляет карточки."""
+        self.cards()
+        post = Post.objects.latest("pk")
+        post.text = "Исправленный пост"
+        post.save()
+        self.group.title = "Новое название"
+        self.group.save()
+        self.author.first_name = "Петр"
+        self.author.save()
+        cards = self.cards()
+        self.assertIn("Исправленный пост", "".join(cards))
+        for card in cards:
+            self.assertIn("Новое название", card)
+            self.assertIn("Петр", card)
@@ -0,0 +1,101 @@
+import os
+import shutil
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from PIL import Image
+
+from .. import images, thumbnails
+from ..models import Post, StoredImage, User
+from .constant import IMAGE, IMAGE_NAME, TEMP_MEDIA_ROOT
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch.object(thumbnails, "schedule")
+class StoredImagesTest(TransactionTestCase):
+    # TransactionTestCase: файлы удаляются в on_commit.
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="author")
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name="meme.png", content=IMAGE):
+        return Post.objects.create(
+            author=self.user,
+            text="Пост",
+            image=SimpleUploadedFile(name, content, "image/png"),
+        )
+
+    def references(self, name):
+        return StoredImage.objects.get(name=name).references
+
+    def test_same_content_stored_once(self, schedule):
+        """Одинаковые загрузки - один файл и счетчик ссылок."""
+        first = self.create_post("meme.png")
+        second = self.create_post("copy.PNG")
+        self.assertEqual(first.image.name, IMAGE_NAME)
+        self.assertEqual(second.image.name, IMAGE_NAME)
+        self.assertEqual(self.references(IMAGE_NAME), 2)
+        directory = os.path.dirname(images.storage.path(IMAGE_NAME))
+        self.assertEqual(os.listdir(directory), [os.path.basename(IMAGE_NAME)])
+
+    def test_file_deleted_with_last_reference(self, schedule):
+        """Файл удаляется, когда на него не ссылается ни один пост."""
+        first = self.create_post()
+        second = self.create_post()
+        first.delete()
+        self.assertTrue(images.storage.exists(IMAGE_NAME))
+        second.image = SimpleUploadedFile("other.png", IMAGE + b"\0")
+        second.save()
+        self.assertFalse(images.storage.exists(IMAGE_NAME))
+        self.assertFalse(StoredImage.objects.filter(name=IMAGE_NAME).exists())
+        self.assertEqual(self.references(second.image.name), 1)
+
+    def test_saved_again_not_collected(self, schedule):
+        """Файл, сохраненный заново в той же транзакции, где снята
+        последняя ссылка, сборка не удаляет."""
+        post = self.create_post()
+        with transaction.atomic():
+            post.delete()
+            images.storage.save("posts/again.png", ContentFile(IMAGE))
+            images.collect(IMAGE_NAME)
+            self.assertTrue(images.storage.exists(IMAGE_NAME))
+
+    def test_deferred_image_released(self, schedule):
+        """Удаление поста с отложенной картинкой освобождает ссылку."""
+        post = self.create_post()
+        Post.objects.only("text").get(pk=post.pk).delete()
+        self.assertFalse(images.storage.exists(IMAGE_NAME))
+        self.assertFalse(StoredImage.objects.filter(name=IMAGE_NAME).exists())
+
+    def test_reconcile(self, schedule):
+        """reconcile пересчитывает ссылки после bulk_create."""
+        post = self.create_post()
+        Post.objects.bulk_create(
+            Post(author=self.user, text="Копия", image=post.image.name)
+            for _ in range(2)
+        )
+        self.assertEqual(images.reconcile(), 1)
+        self.assertEqual(self.references(IMAGE_NAME), 3)
+
+    @override_settings(IMAGE_MAX_DIMENSION=20)
+    def test_downsample(self, schedule):
+        """Большой оригинал уменьшается, посты переходят на новый файл."""
+        buffer = BytesIO()
+        Image.new("RGB", (100, 40), "red").save(buffer, format="PNG")
+        posts = [self.create_post(content=buffer.getvalue()) for _ in range(2)]
+        name = posts[0].image.name
+        new_name = images.downsample(name)
+        self.assertNotEqual(new_name, name)
+        with images.storage.open(new_name) as file, Image.open(file) as image:
+            self.assertEqual(image.size, (20, 8))
+        self.assertEqual(
+            set(Post.objects.values_list("image", flat=True)), {new_name}
+        )
+        self.assertEqual(self.references(new_name), 2)
+        self.assertFalse(images.storage.exists(name))
+        self.assertEqual(images.downsample(new_name), new_name)
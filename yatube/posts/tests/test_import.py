@@ -0,0 +1,162 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import timeline
+from ..counters import get_counters
+from ..models import Group, Post, Timeline, User
+from .constant import IMAGE, TEMP_MEDIA_ROOT
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="import_author")
+        cls.reader = User.objects.create_user(username="import_reader")
+        cls.reader.follower.create(author=cls.author)
+        Group.objects.create(slug="known", title="Известная")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.archive = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive)
+
+    def write(self, name, rows):
+        with open(os.path.join(self.archive, name), "w") as file:
+            file.writelines(json.dumps(row) + "\n" for row in rows)
+
+    def test_import(self):
+        """import_posts загружает посты, группы и картинки."""
+        os.mkdir(os.path.join(self.archive, "posts"))
+        with open(os.path.join(self.archive, "posts", "pic.gif"), "wb") as f:
+            f.write(IMAGE)
+        self.write(
+            "groups.ndjson",
+            [{"slug": "new", "title": "Новая", "description": "Описание"}],
+        )
+        self.write(
+            "posts.ndjson",
+            [
+                {
+                    "text": "С картинкой",
+                    "pub_date": "2020-01-02T03:04:05.000006+00:00",
+                    "author": "import_author",
+                    "group": "new",
+                    "image": "posts/pic.gif",
+                },
+                {"text": "В группе", "author": "import_author", "group": "x"},
+                {"text": "Чужой", "author": "nobody", "group": "known"},
+                {
+                    "text": "Без картинки",
+                    "author": "import_author",
+                    "image": "../secret.gif",
+                },
+            ],
+        )
+        call_command(
+            "import_posts",
+            self.archive,
+            "--batch-size=2",
+            stdout=StringIO(),
+            stderr=StringIO(),
+        )
+        posts = {post.text: post for post in Post.objects.all()}
+        self.assertEqual(
+            set(posts), {"С картинкой", "В группе", "Без картинки"}
+        )
+        post = posts["С картинкой"]
+        self.assertEqual(post.group.title, "Новая")
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(post.image.read(), IMAGE)
+        self.assertEqual(posts["В группе"].group.slug, "x")
+        self.assertEqual(posts["Без картинки"].image, "")
+        self.author.refresh_from_db()
+        self.assertEqual(get_counters(self.author).posts_count, 3)
+        self.assertEqual(timeline.check(self.reader.pk), (set(), set()))
+
+    def test_reimport(self):
+        """Повторная загрузка не дублирует посты, чужой пост с тем же id
+        не мешает загрузке, ленты подписчиков других авторов
+        не трогаются."""
+        other = User.objects.create_user(username="other_author")
+        self.reader.follower.create(author=other)
+        unrelated = Post.objects.create(author=other, text="Чужая лента")
+        entries = list(
+            Timeline.objects.filter(author=other).values_list("pk", flat=True)
+        )
+        self.write(
+            "posts.ndjson",
+            [
+                {
+                    "id": unrelated.pk,
+                    "text": "Первый",
+                    "author": "import_author",
+                    "pub_date": "2020-01-01T00:00:00.000001+00:00",
+                },
+                {
+                    "id": 1000,
+                    "text": "Второй",
+                    "author": "import_author",
+                    "pub_date": "2020-01-02T00:00:00+03:00",
+                },
+            ],
+        )
+        outputs = []
+        for _ in range(2):
+            stdout = StringIO()
+            call_command("import_posts", self.archive, stdout=stdout)
+            outputs.append(stdout.getvalue())
+        self.assertIn("Загружено постов: 2 ", outputs[0])
+        self.assertIn("Загружено постов: 0 ", outputs[1])
+        self.assertIn("загруженных ранее: 2", outputs[1])
+        self.assertEqual(
+            sorted(
+                Post.objects.filter(author=self.author).values_list(
+                    "text", flat=True
+                )
+            ),
+            ["Второй", "Первый"],
+        )
+        self.assertEqual(Post.objects.get(pk=unrelated.pk).text, "Чужая лента")
+        self.assertEqual(Post.objects.get(pk=1000).text, "Второй")
+        self.assertEqual(
+            list(
+                Timeline.objects.filter(author=other).values_list(
+                    "pk", flat=True
+                )
+            ),
+            entries,
+        )
+        self.assertEqual(timeline.check(self.reader.pk), (set(), set()))
+
+    def test_large_batch(self):
+        """Пачка больше 500 строк загружается целиком."""
+        self.write(
+            "posts.ndjson",
+            [
+                {
+                    "id": 2000 + i,
+                    "text": f"Пост {i}",
+                    "author": "import_author",
+                }
+                for i in range(600)
+            ]
+            + [
+                {"text": f"Без id {i}", "author": "import_author"}
+                for i in range(600)
+            ],
+        )
+        call_command("import_posts", self.archive, stdout=StringIO())
+        self.assertEqual(Post.objects.filter(author=self.author).count(), 1200)
+        self.assertEqual(timeline.check(self.reader.pk), (set(), set()))
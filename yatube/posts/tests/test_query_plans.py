@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import timeline
+from ..models import Comment, Follow, Group, Post, User
+from .constant import FOLLOW, GROUP_LIST, INDEX, PROFILE, TEST_SLUG, TEST_USER
+
+# Признаки плана без подходящего индекса: полный проход таблицы
+# и сортировка во временном B-дереве.
+FULL_SCAN = "SCAN "
+TEMP_SORT = "USE TEMP B-TREE"
+
+
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=TEST_USER)
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(slug=TEST_SLUG, title="Группа")
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text="Пост"
+        )
+        Comment.objects.create(post=cls.post, author=cls.reader, text="Да")
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f"Пост {i}")
+            for i in range(30)
+        )
+        timeline.rebuild(cls.reader.pk)
+        cls.client_reader = Client()
+        cls.client_reader.force_login(cls.reader)
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+
+    def queries(self, url, params):
+        # Запросы страницы, а для курсорной ленты - и следующей страницы.
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client_reader.get(url, params)
+        page_obj = response.context.get("page_obj")
+        cursor = getattr(page_obj, "next_cursor", None)
+        if cursor:
+            with CaptureQueriesContext(connection) as more:
+                self.client_reader.get(url, {"cursor": cursor})
+            queries.captured_queries.extend(more.captured_queries)
+        return [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith("SELECT")
+        ]
+
+    def test_feeds_use_indexes(self):
+        """Запросы лент не читают таблицы целиком и не сортируют
+        во временном B-дереве."""
+        urls = [
+            INDEX,
+            GROUP_LIST,
+            PROFILE,
+            FOLLOW,
+            reverse("posts:post_detail", args=[self.post.pk]),
+        ]
+        for url in urls:
+            for params in ({}, {"page": 2}):
+                for sql in self.queries(url, params):
+                    plan = self.plan(sql)
+                    with self.subTest(url=url, sql=sql, plan=plan):
+                        for step in plan:
+                            self.assertFalse(
+                                step.startswith(FULL_SCAN)
+                                and "USING" not in step,
+                                step,
+                            )
+                            self.assertNotIn(TEMP_SORT, step)
@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, TestCase
+
+from ..models import Post, User
+from ..search import search
+from .constant import SEARCH
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="author")
+        cls.admin = User.objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+
+    def found(self, query):
+        return list(search(query).values_list("text", flat=True))
+
+    def test_index_follows_writes(self):
+        """Индекс обновляется при создании, правке и удалении постов,
+        в том числе через bulk_create."""
+        post = Post.objects.create(author=self.user, text="Кошки спят")
+        Post.objects.bulk_create([Post(author=self.user, text="Собаки лают")])
+        self.assertEqual(self.found("кошки"), ["Кошки спят"])
+        self.assertEqual(self.found("собаки"), ["Собаки лают"])
+        post.text = "Кошки играют"
+        post.save()
+        self.assertEqual(self.found("спят"), [])
+        self.assertEqual(self.found("играют"), ["Кошки играют"])
+        post.delete()
+        self.assertEqual(self.found("кошки"), [])
+
+    def test_ranking_and_prefix(self):
+        """Слова ищутся по префиксу, релевантные посты выше."""
+        Post.objects.create(author=self.user, text="Про погоду и кошку")
+        Post.objects.create(author=self.user, text="Кошка, кошка, кошки")
+        self.assertEqual(
+            self.found("КОШ"), ["Кошка, кошка, кошки", "Про погоду и кошку"]
+        )
+        self.assertEqual(self.found("кошк погоду"), ["Про погоду и кошку"])
+        self.assertEqual(self.found('"*'), [])
+
+    def test_search_page_paginates(self):
+        """Страница поиска делит выдачу на страницы и сохраняет запрос
+        в ссылках."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f"Пост номер {i}")
+            for i in range(settings.PAGE_COUNT + 1)
+        )
+        response = self.client.get(SEARCH, {"q": "пост"})
+        self.assertEqual(
+            len(response.context["page_obj"]), settings.PAGE_COUNT
+        )
+        self.assertContains(response, "?q=%D0%BF%D0%BE%D1%81%D1%82&amp;page=2")
+        response = self.client.get(SEARCH, {"q": "пост", "page": 2})
+        self.assertEqual(len(response.context["page_obj"]), 1)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идет через полнотекстовый индекс."""
+        Post.objects.create(author=self.user, text="Найди меня")
+        Post.objects.create(author=self.user, text="Другой пост")
+        request = RequestFactory().get("/")
+        request.user = self.admin
+        model_admin = site._registry[Post]
+        queryset, distinct = model_admin.get_search_results(
+            request, Post.objects.all(), "найди"
+        )
+        self.assertEqual(
+            list(queryset.values_list("text", flat=True)), ["Найди меня"]
+        )
+        self.assertFalse(distinct)
@@ -0,0 +1,38 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import timeline
+from ..counters import get_counters
+from ..models import Comment, Follow, Group, Post, User
+
+
+class SeedTest(TestCase):
+    def test_seed_creates_consistent_data(self):
+        """seed создает данные, а счетчики и ленты сходятся с ними.
+        Комментариев больше 500 - больше, чем SQLite принимает строк
+        в одном INSERT."""
+        call_command(
+            "seed",
+            "--users=30",
+            "--groups=3",
+            "--posts=200",
+            "--comments=600",
+            "--follows=5",
+            "--seed=1",
+            stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 600)
+        self.assertTrue(Follow.objects.exists())
+        self.assertGreater(
+            Post.objects.values("pub_date__date").distinct().count(), 1
+        )
+        for user in User.objects.all():
+            self.assertEqual(
+                get_counters(user).posts_count, user.posts.count()
+            )
+            self.assertEqual(timeline.check(user.pk), (set(), set()))
@@ -0,0 +1,120 @@
+import shutil
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from .. import caching, thumbnails
+from ..models import Post, User
+from .constant import IMAGE, TEMP_MEDIA_ROOT
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="author")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self):
+        return Post.objects.create(
+            author=self.user,
+            text="Пост с картинкой",
+            image=SimpleUploadedFile("pic.gif", IMAGE, "image/gif"),
+        )
+
+    def test_new_image_scheduled(self):
+        """Миниатюра ставится в очередь только для новой картинки."""
+        with mock.patch.object(thumbnails, "schedule") as schedule:
+            post = self.create_post()
+            schedule.assert_called_once_with(post.image.name)
+            post = Post.objects.get(pk=post.pk)
+            post.text = "Новый текст"
+            post.save()
+            schedule.assert_called_once()
+            post.image = SimpleUploadedFile(
+                "pic_2.gif", IMAGE + b"\0", "image/gif"
+            )
+            post.save()
+            self.assertEqual(schedule.call_count, 2)
+            schedule.assert_called_with(post.image.name)
+
+    def test_fallback_to_original(self):
+        """Пока миниатюры нет, отдается оригинал."""
+        with mock.patch.object(thumbnails, "schedule"):
+            post = self.create_post()
+        with mock.patch.object(thumbnails, "schedule") as schedule:
+            self.assertEqual(
+                thumbnails.picture(post.image),
+                {"src": post.image.url, "sources": []},
+            )
+            schedule.assert_called_once_with(post.image.name)
+        name = thumbnails.generate(post.image.name)
+        thumbnail = thumbnails.lookup(post.image)
+        self.assertEqual(thumbnail.name, name)
+        self.assertEqual(thumbnails.picture(post.image)["src"], thumbnail.url)
+        response = self.client.get(f"/posts/{post.pk}/")
+        self.assertContains(response, thumbnail.url)
+
+    def test_pages_invalidated_when_ready(self):
+        """Готовая миниатюра сбрасывает кэш страниц с этим постом."""
+        with mock.patch.object(thumbnails, "schedule"):
+            post = self.create_post()
+        scope = caching.POST.format(post.pk)
+        before = caching.generations(scope)
+        # Закрытие соединений сломало бы транзакцию теста.
+        with mock.patch.object(thumbnails, "connections"):
+            thumbnails._generate_pending(post.image.name)
+        self.assertNotEqual(caching.generations(scope), before)
+        self.assertIsNotNone(thumbnails.lookup(post.image))
+
+    @override_settings(THUMBNAIL_WORKERS=1)
+    def test_failure_not_retried(self):
+        """Ошибка пишется в лог, и картинка не встает в очередь снова."""
+        with mock.patch.object(thumbnails, "schedule"):
+            post = self.create_post()
+        with mock.patch.object(thumbnails, "connections"), mock.patch.object(
+            thumbnails, "generate", side_effect=OSError
+        ), self.assertLogs(thumbnails.logger, "ERROR"):
+            thumbnails._generate_pending(post.image.name)
+        with mock.patch.object(
+            thumbnails._executor, "submit"
+        ) as submit, mock.patch.object(
+            thumbnails.transaction, "on_commit", lambda func: func()
+        ):
+            thumbnails.schedule(post.image.name)
+        submit.assert_not_called()
+
+    def test_picture_variants(self):
+        """После генерации страница отдает srcset во всех форматах."""
+        with mock.patch.object(thumbnails, "schedule"):
+            post = self.create_post()
+            self.assertEqual(
+                thumbnails.picture(post.image),
+                {"src": post.image.url, "sources": []},
+            )
+        thumbnails.generate(post.image.name)
+        picture = thumbnails.picture(post.image)
+        self.assertEqual(picture["src"], thumbnails.lookup(post.image).url)
+        for width in thumbnails.WIDTHS:
+            self.assertIn(f" {width}w", picture["srcset"])
+        self.assertEqual(
+            [source["type"] for source in picture["sources"]],
+            [
+                thumbnails.MIME_TYPES[format]
+                for format in thumbnails.MODERN_FORMATS
+            ],
+        )
+        response = self.client.get(f"/posts/{post.pk}/")
+        self.assertContains(response, f'srcset="{picture["srcset"]}"')
+        for source in picture["sources"]:
+            self.assertContains(response, source["srcset"])
@@ -0,0 +1,107 @@
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import timeline
+from ..models import Follow, Post, Timeline, User
+from ..utils import CursorPaginator
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username="reader")
+        cls.author = User.objects.create_user(username="author")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def feed(self):
+        return list(timeline.feed(self.reader))
+
+    def test_post_fan_out(self):
+        """Новый пост попадает в материализованную ленту подписчика."""
+        post = Post.objects.create(author=self.author, text="Пост")
+        self.assertTrue(
+            Timeline.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post])
+
+    def test_cursor_pages_with_followers(self):
+        """Страницы по курсору не повторяют посты, когда у автора
+        несколько подписчиков."""
+        for i in range(2):
+            follower = User.objects.create_user(username=f"follower_{i}")
+            Follow.objects.create(user=follower, author=self.author)
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f"Пост {i}") for i in range(25)
+        )
+        timeline.rebuild_all()
+        expected = list(
+            Post.objects.order_by("-pub_date", "-pk").values_list(
+                "pk", flat=True
+            )
+        )
+        pages = []
+        page = CursorPaginator(timeline.feed(self.reader), 10).get_page(None)
+        pages.append([post.pk for post in page])
+        while page.next_cursor:
+            page = CursorPaginator(timeline.feed(self.reader), 10).get_page(
+                page.next_cursor
+            )
+            pages.append([post.pk for post in page])
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_follow_and_unfollow(self):
+        """Подписка добавляет старые посты автора, отписка убирает их."""
+        other = User.objects.create_user(username="other")
+        post = Post.objects.create(author=other, text="Пост")
+        follow = Follow.objects.create(user=self.reader, author=other)
+        self.assertEqual(self.feed(), [post])
+        follow.delete()
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_fan_out_on_read(self):
+        """Посты популярного автора не рассылаются, а читаются из Post
+        и сливаются с материализованной лентой по дате."""
+        timeline.update_status(self.author.pk)
+        other = User.objects.create_user(username="other")
+        Follow.objects.create(user=self.reader, author=other)
+        first = Post.objects.create(author=self.author, text="Пост")
+        second = Post.objects.create(author=other, text="Пост")
+        third = Post.objects.create(author=self.author, text="Пост")
+        self.assertFalse(Timeline.objects.filter(author=self.author).exists())
+        self.assertEqual(self.feed(), [third, second, first])
+        self.assertEqual(
+            list(timeline.feed(self.reader).order_by("pub_date", "pk")[1:]),
+            [second, third],
+        )
+
+    def test_celebrity_status_change(self):
+        """Посты, опубликованные без рассылки, остаются в лентах, когда
+        автор перестает быть популярным."""
+        with override_settings(TIMELINE_FANOUT_LIMIT=0):
+            timeline.update_status(self.author.pk)
+            post = Post.objects.create(author=self.author, text="Пост")
+            late = User.objects.create_user(username="late")
+            Follow.objects.create(user=late, author=self.author)
+        timeline.update_status(self.author.pk)
+        self.assertEqual(self.feed(), [post])
+        self.assertEqual(list(timeline.feed(late)), [post])
+        self.assertTrue(Timeline.objects.filter(user=late, post=post).exists())
+
+    def test_check_and_backfill(self):
+        """Проверка находит расхождения, а backfill их исправляет."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f"Пост {i}") for i in range(3)
+        )
+        missing, extra = timeline.check(self.reader.pk)
+        self.assertEqual(len(missing), 3)
+        self.assertFalse(extra)
+        call_command("backfill_timeline", self.reader.username)
+        self.assertEqual(timeline.check(self.reader.pk), (set(), set()))
+        call_command("check_timeline")
@@ -19,6 +19,7 @@ from .constant import (
     REDIRECT_LOGIN_FOLLOW_INDEX,
     REDIRECT_LOGIN_UNFOLLOW,
     REDIRECT_POST_CREATE,
+    SEARCH,
     FOLLOW_USER,
     TEST_SLUG,
     TEST_USER,
@@ -63,6 +64,7 @@ class PostURLTest(TestCase):
             self.POST_EDIT: "posts/create_post.html",
             POST_CREATE: "posts/create_post.html",
             FOLLOW: "posts/follow.html",
+            SEARCH: "posts/search.html",
             UNEXISTING_PAGE: "core/404.html",
         }
         for address, template in templates_url_names.items():
@@ -76,6 +78,7 @@ class PostURLTest(TestCase):
             [INDEX, self.client, OK],
             [GROUP_LIST, self.client, OK],
             [PROFILE, self.client, OK],
+            [SEARCH, self.client, OK],
             [self.POST_DETAIL, self.client, OK],
             [self.POST_EDIT, self.client, REDIRECT],
             [POST_CREATE, self.client, REDIRECT],
@@ -1,10 +1,15 @@
+import hashlib
 import shutil
 
 from django.conf import settings
 from django.core.cache import cache
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from ..models import Follow, Group, Post, User
+from core.cache import LOCK_KEY
+from .. import caching, timeline
+from ..models import Comment, Follow, Group, Post, User
 from .constant import (
     FOLLOW,
     GROUP_LIST,
@@ -119,6 +124,7 @@ class PostViewsTest(TestCase):
             )
             for i in range(settings.PAGE_COUNT + 1)
         )
+        timeline.rebuild(self.user_2.pk)
         pages = [
             [INDEX, settings.PAGE_COUNT],
             [GROUP_LIST, settings.PAGE_COUNT],
@@ -134,17 +140,234 @@ class PostViewsTest(TestCase):
                 response = self.authorized_user_2.get(page)
                 self.assertEqual(len(response.context["page_obj"]), num_posts)
 
+    def test_cursor_pagination(self):
+        """Курсорная пагинация проходит ленту вперед и назад
+        без пропусков и повторов."""
+        cache.clear()
+        Post.objects.all().delete()
+        Post.objects.bulk_create(
+            Post(author=self.user, group=self.group, text=f"Пост {i}")
+            for i in range(settings.PAGE_COUNT * 2 + 1)
+        )
+        timeline.rebuild(self.user_2.pk)
+        expected = list(
+            Post.objects.order_by("-pub_date", "-pk").values_list(
+                "pk", flat=True
+            )
+        )
+        for url in (GROUP_LIST, PROFILE, FOLLOW):
+            with self.subTest(url=url):
+                pages = []
+                page_obj = self.authorized_user_2.get(url).context["page_obj"]
+                pages.append([post.pk for post in page_obj])
+                while page_obj.next_cursor:
+                    page_obj = self.authorized_user_2.get(
+                        url, {"cursor": page_obj.next_cursor}
+                    ).context["page_obj"]
+                    pages.append([post.pk for post in page_obj])
+                self.assertEqual(sum(pages, []), expected)
+                self.assertEqual(len(pages[-1]), 1)
+                page_obj = self.authorized_user_2.get(
+                    url, {"cursor": page_obj.previous_cursor}
+                ).context["page_obj"]
+                self.assertEqual([post.pk for post in page_obj], pages[-2])
+                self.assertTrue(page_obj.has_previous())
+                self.assertTrue(page_obj.has_next())
+
+    @override_settings(PAGE_OFFSET_LIMIT=2)
+    def test_offset_pages(self):
+        """Номера страниц без COUNT(*) и не дальше PAGE_OFFSET_LIMIT,
+        с последней из них дальше ведет курсор."""
+        cache.clear()
+        Post.objects.all().delete()
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f"Пост {i}")
+            for i in range(settings.PAGE_COUNT * 3)
+        )
+        expected = list(
+            Post.objects.order_by("-pub_date", "-pk").values_list(
+                "pk", flat=True
+            )
+        )
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(PROFILE, {"page": 2})
+        self.assertFalse(
+            [q for q in captured if "COUNT(" in q["sql"].upper()]
+        )
+        page_obj = response.context["page_obj"]
+        self.assertEqual(list(page_obj.paginator.page_range), [1, 2])
+        self.assertNotContains(response, "page=3")
+        page_obj = self.client.get(
+            PROFILE, {"cursor": page_obj.next_cursor}
+        ).context["page_obj"]
+        self.assertEqual(
+            [post.pk for post in page_obj],
+            expected[settings.PAGE_COUNT * 2:],
+        )
+        response = self.client.get(PROFILE, {"page": 3})
+        self.assertEqual(response.status_code, 404)
+
+    def test_feed_query_budget(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        Post.objects.all().delete()
+        for i in range(settings.PAGE_COUNT):
+            author = User.objects.create_user(username=f"author_{i}")
+            Follow.objects.create(user=self.user_2, author=author)
+            Post.objects.create(
+                author=author, group=self.group, text=f"Тестовый пост {i}"
+            )
+            Post.objects.create(
+                author=self.user,
+                group=Group.objects.create(slug=f"slug_{i}", title=f"{i}"),
+                text=f"Тестовый пост {i}",
+            )
+        # Группа и профиль ищутся еще и для ETag
+        budgets = (
+            (INDEX, 3),
+            (GROUP_LIST, 5),
+            (PROFILE, 7),
+            (FOLLOW, 4),
+        )
+        for url, queries in budgets:
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    self.authorized_user_2.get(url)
+
+    def test_comments_paginated(self):
+        """Страница поста показывает первую порцию комментариев,
+        остальные подгружаются по курсору, авторы - тем же запросом."""
+        post_comments = reverse("posts:post_comments", args=[self.post.pk])
+        queries = []
+        for authors in (1, 3):
+            Comment.objects.all().delete()
+            Comment.objects.bulk_create(
+                Comment(
+                    post=self.post,
+                    author=User.objects.get_or_create(
+                        username=f"commenter_{i % authors}"
+                    )[0],
+                    text=f"Комментарий {i}",
+                )
+                for i in range(settings.COMMENT_PAGE_COUNT * 2 + 1)
+            )
+            with CaptureQueriesContext(connection) as captured:
+                comments = self.client.get(self.POST_DETAIL).context[
+                    "comments"
+                ]
+            queries.append(len(captured))
+        self.assertEqual(queries[0], queries[1])
+        expected = list(
+            Comment.objects.order_by("-pub_date", "-pk").values_list(
+                "pk", flat=True
+            )
+        )
+        pages = [[comment.pk for comment in comments]]
+        while comments.next_cursor:
+            with self.assertNumQueries(1):
+                comments = self.client.get(
+                    post_comments, {"cursor": comments.next_cursor}
+                ).context["comments"]
+            pages.append([comment.pk for comment in comments])
+        self.assertEqual(
+            [len(page) for page in pages],
+            [settings.COMMENT_PAGE_COUNT, settings.COMMENT_PAGE_COUNT, 1],
+        )
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_comments_of_missing_post(self):
+        """Подгрузка комментариев несуществующего поста отдает 404."""
+        response = self.client.get(
+            reverse("posts:post_comments", args=[self.post.pk + 1000])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_conditional_get(self):
+        """Неизмененная страница отдается как 304 до рендеринга,
+        после записи - заново."""
+        cases = (
+            (INDEX, lambda: Post.objects.create(author=self.user, text="1")),
+            (
+                GROUP_LIST,
+                lambda: Post.objects.create(
+                    author=self.user, group=self.group, text="Новый"
+                ),
+            ),
+            (
+                self.POST_DETAIL,
+                lambda: Comment.objects.create(
+                    post=self.post, author=self.user_2, text="Комментарий"
+                ),
+            ),
+            (FOLLOW, lambda: Post.objects.create(author=self.user, text="2")),
+        )
+        for url, write in cases:
+            with self.subTest(url=url):
+                response = self.authorized_user_2.get(url)
+                etag = response["ETag"]
+                self.assertNotIn("Last-Modified", response)
+                response = self.authorized_user_2.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+                self.assertNotEqual(self.client.get(url).get("ETag"), etag)
+                write()
+                response = self.authorized_user_2.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_stale_page_without_etag(self):
+        """Устаревшая копия, отданная во время пересчета, уходит
+        без ETag."""
+        cache.clear()
+        etag = self.authorized_user_2.get(INDEX)["ETag"]
+        Post.objects.create(author=self.user, text="Новый пост")
+        key = caching.PAGE_KEY.format(
+            hashlib.md5(INDEX.encode()).hexdigest(), self.user_2.pk
+        )
+        # Страницу пересчитывает другой воркер.
+        cache.add(LOCK_KEY.format(key), "leader")
+        response = self.authorized_user_2.get(INDEX, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context)
+        self.assertNotIn("ETag", response)
+
     def test_cache_index_page(self):
-        """При удалении поста он останется в response.content /index/,
-        пока не отчистить кэш принудительно."""
+        """Главная страница отдается из кэша, пока посты не меняются,
+        и обновляется сразу после удаления поста."""
+        cache.clear()
         response_1 = self.authorized_user.get(INDEX)
-        Post.objects.all().delete
         response_2 = self.authorized_user.get(INDEX)
         self.assertEqual(response_1.content, response_2.content)
-        cache.clear()
+        self.assertIsNone(response_2.context)
+        Post.objects.all().delete()
         response_3 = self.authorized_user.get(INDEX)
         self.assertNotEqual(response_1.content, response_3.content)
 
+    def test_cache_invalidated_on_write(self):
+        """Изменение поста, группы или имени автора сбрасывает кэш
+        лент, в которых они видны."""
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = "Новое название"
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = "Имя"
+        cases = (
+            (GROUP_LIST, lambda: Post.objects.create(
+                author=self.user_2, group=self.group, text="Новый пост"
+            )),
+            (PROFILE, group.save),
+            (INDEX, lambda: author.save(update_fields=["first_name"])),
+        )
+        for url, write in cases:
+            with self.subTest(url=url):
+                cache.clear()
+                self.authorized_user.get(url)
+                self.assertIsNone(self.authorized_user.get(url).context)
+                write()
+                self.assertIsNotNone(self.authorized_user.get(url).context)
+
     def test_follow_page(self):
         """Авторизированный автор может подписаться на другого автора."""
         follow_count = Follow.objects.count()
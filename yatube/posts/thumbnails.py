@@ -0,0 +1,162 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import caching, images
+from .models import Post
+
+# Основная миниатюра картинки поста в ленте и на странице поста
+GEOMETRY = "960x339"
+OPTIONS = {"crop": "center", "upscale": True}
+
+# Ширины вариантов для srcset, пропорции - как у основной миниатюры.
+WIDTHS = (320, 640, 960)
+# Современные форматы, которые умеют сохранять и sorl, и Pillow.
+# AVIF появится с плагином Pillow, JPEG остается для старых браузеров.
+Image.init()
+MODERN_FORMATS = [
+    format
+    for format in ("AVIF", "WEBP")
+    if format in EXTENSIONS and format in Image.SAVE
+]
+FORMAT_OPTIONS = {"AVIF": {"quality": 60}, "WEBP": {"quality": 80}}
+MIME_TYPES = {"AVIF": "image/avif", "WEBP": "image/webp", "JPEG": "image/jpeg"}
+# Карточка поста занимает всю ширину экрана, но не больше 960px.
+SIZES = "(max-width: 960px) 100vw, 960px"
+
+PENDING_KEY = "thumbnail:pending:{}"
+FAILED = "failed"
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=max(settings.THUMBNAIL_WORKERS, 1),
+    thread_name_prefix="thumbnails",
+)
+
+
+def variants():
+    # (формат, ширина, геометрия, опции) всех вариантов миниатюры.
+    # Основная идет первой: generate строит их по порядку, и готовый
+    # последний вариант значит, что готовы все.
+    width, height = map(int, GEOMETRY.split("x"))
+    for format in ["JPEG", *MODERN_FORMATS]:
+        options = dict(OPTIONS, **FORMAT_OPTIONS.get(format, {}))
+        if format != "JPEG":
+            options["format"] = format
+        for variant_width in sorted(WIDTHS, reverse=True):
+            variant_height = round(height * variant_width / width)
+            yield (
+                format,
+                variant_width,
+                f"{variant_width}x{variant_height}",
+                options,
+            )
+
+
+def _thumbnail_name(source, geometry=GEOMETRY, options=OPTIONS):
+    # Имя файла миниатюры так же, как его строит
+    # ThumbnailBackend.get_thumbnail, но без чтения исходника.
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault("format", backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+def lookup(image, geometry=GEOMETRY, options=OPTIONS):
+    # Готовая миниатюра или None. Ничего не генерирует.
+    source = ImageFile(image)
+    return default.kvstore.get(
+        ImageFile(_thumbnail_name(source, geometry, options), default.storage)
+    )
+
+
+def generate(name):
+    # Строит все варианты миниатюры (или берет готовые) и возвращает
+    # имя основной. Имя миниатюры зависит от имени исходника, то есть
+    # от хэша содержимого: одинаковые картинки делят миниатюры.
+    source = ImageFile(name, images.storage)
+    names = [
+        get_thumbnail(source, geometry, **options).name
+        for _, _, geometry, options in variants()
+    ]
+    return names[0]
+
+
+def _generate_pending(name):
+    # Результат задачи никто не читает, поэтому ошибку пишем в лог.
+    # Ключ задачи остается на THUMBNAIL_FAILURE_TIMEOUT с пометкой
+    # об ошибке, чтобы картинку не ставили в очередь на каждом запросе.
+    key = PENDING_KEY.format(name)
+    try:
+        # Слишком большой оригинал сначала уменьшается, миниатюры
+        # строятся уже по нему.
+        image = images.downsample(name)
+        generate(image)
+        # Закэшированные страницы ссылаются на оригинал.
+        for post in Post.objects.filter(image=image):
+            caching.invalidate_post(post)
+    except Exception:
+        logger.exception("Не удалось построить миниатюры %s", name)
+        cache.set(key, FAILED, settings.THUMBNAIL_FAILURE_TIMEOUT)
+    else:
+        cache.delete(key)
+    finally:
+        # Воркер живет вне цикла запроса, соединения закрываем сами.
+        connections.close_all()
+
+
+def schedule(name):
+    # Ставит миниатюру в очередь после коммита транзакции, чтобы
+    # воркер увидел сохраненный файл. Повторы отбрасываются,
+    # пока задача в очереди или недавно завершилась ошибкой.
+    # При THUMBNAIL_WORKERS = 0 остаются оригиналы.
+    if not name or not settings.THUMBNAIL_WORKERS:
+        return
+
+    def submit():
+        if cache.add(
+            PENDING_KEY.format(name), 1, settings.THUMBNAIL_PENDING_TIMEOUT
+        ):
+            _executor.submit(_generate_pending, name)
+
+    transaction.on_commit(submit)
+
+
+def picture(image):
+    # Данные для <picture>: основной src, srcset по форматам и sizes.
+    # Пока готовы не все варианты - только оригинал.
+    *_, (_, _, geometry, options) = variants()
+    if lookup(image, geometry, options) is None:
+        schedule(image.name)
+        return {"src": image.url, "sources": []}
+    source = ImageFile(image)
+    srcsets = {}
+    for format, width, geometry, options in variants():
+        url = default.storage.url(_thumbnail_name(source, geometry, options))
+        srcsets.setdefault(format, []).append(f"{url} {width}w")
+    return {
+        "src": default.storage.url(_thumbnail_name(source)),
+        "srcset": ", ".join(srcsets.pop("JPEG")),
+        "sources": [
+            {"type": MIME_TYPES[format], "srcset": ", ".join(srcset)}
+            for format, srcset in srcsets.items()
+        ],
+        "sizes": SIZES,
+    }
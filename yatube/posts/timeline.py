@@ -0,0 +1,298 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Q
+
+from .models import Follow, Post, Timeline, UserCounters
+from .utils import batched, position
+
+CELEBRITIES_KEY = "timeline:celebrities"
+
+
+def celebrity_ids():
+    # Популярные авторы (UserCounters.is_celebrity): их посты
+    # не рассылаются, а подмешиваются в ленту при чтении.
+    ids = cache.get(CELEBRITIES_KEY)
+    if ids is None:
+        ids = set(
+            UserCounters.objects.filter(is_celebrity=True).values_list(
+                "user_id", flat=True
+            )
+        )
+        cache.set(CELEBRITIES_KEY, ids, settings.TIMELINE_CELEBRITY_TIMEOUT)
+    return ids
+
+
+def update_status(author_id):
+    # Автор стал популярным или перестал им быть, когда подписчиков
+    # стало больше TIMELINE_FANOUT_LIMIT или снова не больше. Вместе
+    # с признаком меняются записи лент всех его подписчиков: иначе
+    # посты, опубликованные без рассылки, пропали бы из лент.
+    counters = (
+        UserCounters.objects.filter(user_id=author_id)
+        .values_list("followers_count", "is_celebrity")
+        .first()
+    )
+    if counters is None:
+        return
+    followers_count, is_celebrity = counters
+    celebrity = followers_count > settings.TIMELINE_FANOUT_LIMIT
+    if celebrity == is_celebrity:
+        return
+    UserCounters.objects.filter(user_id=author_id).update(
+        is_celebrity=celebrity
+    )
+    cache.delete(CELEBRITIES_KEY)
+    for user_id in (
+        Follow.objects.filter(author_id=author_id)
+        .values_list("user_id", flat=True)
+        .iterator()
+    ):
+        if celebrity:
+            unfollow(user_id, author_id)
+        else:
+            follow(user_id, author_id)
+
+
+def _insert(entries):
+    Timeline.objects.bulk_create(
+        entries, batch_size=settings.TIMELINE_BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out(post):
+    # Рассылает новый пост в ленты подписчиков автора.
+    if post.author_id in celebrity_ids():
+        return
+    _insert(
+        Timeline(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in Follow.objects.filter(author_id=post.author_id)
+        .values_list("user_id", flat=True)
+        .iterator()
+    )
+
+
+def follow(user_id, author_id):
+    # Добавляет в ленту подписчика уже опубликованные посты автора.
+    if author_id in celebrity_ids():
+        return
+    _insert(
+        Timeline(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in Post.objects.filter(author_id=author_id)
+        .values_list("pk", "pub_date")
+        .iterator()
+    )
+
+
+def unfollow(user_id, author_id):
+    Timeline.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def _field(lookup, fields):
+    # Поле поста в фильтре или сортировке -> поле источника ленты.
+    name, *rest = lookup.split("__", 1)
+    return "__".join([fields.get(name, name), *rest])
+
+
+# Позиция поста в записи ленты: Timeline.pub_date совпадает с датой
+# поста, а порядок задает индекс timeline_user_date_post_idx.
+TIMELINE_FIELDS = {
+    "pub_date": "timeline_entries__pub_date",
+    "pk": "timeline_entries__post_id",
+}
+
+
+class Feed:
+    """Лента подписок, которую листают CursorPaginator и OffsetPaginator.
+
+    Страница по (pub_date, id) читается из источников по индексам:
+    посты из Timeline читателя - по timeline_user_date_post_idx
+    с присоединением Post, посты каждого популярного автора из
+    подписок - по post_author_date_idx. Источники сливаются в Python.
+    Поддерживает то, что нужно пагинаторам и api.views.rows:
+    filter/exclude по pub_date и pk, order_by, values и срезы.
+    """
+
+    def __init__(self, user, posts=None, lookups=(), ordering=None):
+        self.user = user
+        self.posts = Post.objects.for_feed() if posts is None else posts
+        self.lookups = lookups
+        self.ordering = ordering or ("-pub_date", "-pk")
+
+    def _clone(self, **changes):
+        state = {
+            "user": self.user,
+            "posts": self.posts,
+            "lookups": self.lookups,
+            "ordering": self.ordering,
+        }
+        state.update(changes)
+        return Feed(**state)
+
+    def filter(self, **lookups):
+        return self._clone(lookups=(*self.lookups, ("filter", lookups)))
+
+    def exclude(self, **lookups):
+        return self._clone(lookups=(*self.lookups, ("exclude", lookups)))
+
+    def order_by(self, *ordering):
+        return self._clone(ordering=ordering)
+
+    def values(self, *fields):
+        return self._clone(posts=self.posts.values(*fields))
+
+    def _sources(self):
+        # (условие, поля позиции) каждого источника ленты.
+        yield {"timeline_entries__user": self.user}, TIMELINE_FIELDS
+        celebrities = celebrity_ids()
+        if not celebrities:
+            return
+        for author_id in Follow.objects.filter(
+            user=self.user, author_id__in=celebrities
+        ).values_list("author_id", flat=True):
+            yield {"author_id": author_id}, {}
+
+    def _page(self, condition, fields, limit):
+        # Условие источника и фильтры - одним filter(): каждый вызов
+        # заново присоединял бы Timeline, уже без читателя, и пост
+        # повторялся бы по разу на подписчика. exclude идет по полям
+        # самого поста, они совпадают с полями записи ленты.
+        posts = self.posts.filter(
+            Q(**condition),
+            *(
+                Q(
+                    **{
+                        _field(key, fields): value
+                        for key, value in lookups.items()
+                    }
+                )
+                for method, lookups in self.lookups
+                if method == "filter"
+            ),
+        )
+        for method, lookups in self.lookups:
+            if method == "exclude":
+                posts = posts.exclude(**lookups)
+        # F: order_by("timeline_entries__post_id") сортировал бы
+        # по Post.Meta.ordering, а не по столбцу индекса.
+        posts = posts.order_by(
+            *(
+                F(_field(field.lstrip("-"), fields)).desc()
+                if field.startswith("-")
+                else F(_field(field, fields)).asc()
+                for field in self.ordering
+            )
+        )
+        return list(posts if limit is None else posts[:limit])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            stop = index + 1
+            return self[index:stop][0]
+        posts = heapq.merge(
+            *(
+                self._page(condition, fields, index.stop)
+                for condition, fields in self._sources()
+            ),
+            key=position,
+            reverse=self.ordering[0].startswith("-"),
+        )
+        return list(islice(posts, index.start, index.stop))
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+def feed(user):
+    # Посты ленты подписок: материализованные записи плюс посты
+    # популярных авторов, которые собираются при чтении.
+    return Feed(user)
+
+
+def expected_entries(user_id):
+    # Записи, которые должны быть в ленте пользователя.
+    return set(
+        Post.objects.filter(
+            author__following__user_id=user_id,
+        )
+        .exclude(author_id__in=celebrity_ids())
+        .values_list("pk", flat=True)
+    )
+
+
+def check(user_id):
+    # Возвращает (пропущенные, лишние) посты материализованной ленты.
+    expected = expected_entries(user_id)
+    actual = set(
+        Timeline.objects.filter(user_id=user_id).values_list(
+            "post_id", flat=True
+        )
+    )
+    return expected - actual, actual - expected
+
+
+def rebuild(user_id):
+    # Пересобирает ленту пользователя с нуля.
+    Timeline.objects.filter(user_id=user_id).delete()
+    for author_id in Follow.objects.filter(user_id=user_id).values_list(
+        "author_id", flat=True
+    ):
+        follow(user_id, author_id)
+
+
+def _fill(author_ids=None):
+    # Записи лент одним INSERT ... SELECT, не выбирая посты в Python.
+    # Без author_ids - всех авторов, кроме популярных.
+    sql = (
+        f"INSERT INTO {Timeline._meta.db_table} "
+        "(user_id, post_id, author_id, pub_date) "
+        "SELECT follow.user_id, post.id, post.author_id, post.pub_date "
+        f"FROM {Follow._meta.db_table} follow "
+        f"JOIN {Post._meta.db_table} post "
+        "ON post.author_id = follow.author_id "
+        "WHERE follow.author_id NOT IN ("
+        f"SELECT user_id FROM {UserCounters._meta.db_table} "
+        "WHERE is_celebrity)"
+    )
+    params = []
+    if author_ids is not None:
+        sql += " AND follow.author_id IN ({})".format(
+            ", ".join(["%s"] * len(author_ids))
+        )
+        params = author_ids
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def rebuild_all():
+    # Пересобирает все ленты. Нужен после массовой загрузки:
+    # bulk_create не рассылает посты. Популярных авторов отмечает
+    # по счетчикам, их надо сверить заранее.
+    UserCounters.objects.update(is_celebrity=False)
+    UserCounters.objects.filter(
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).update(is_celebrity=True)
+    cache.delete(CELEBRITIES_KEY)
+    Timeline.objects.all().delete()
+    _fill()
+
+
+def rebuild_authors(author_ids):
+    # Пересобирает записи этих авторов в лентах их подписчиков, например
+    # после загрузки их постов. Остальные записи лент не трогает.
+    for batch in batched(author_ids, settings.TIMELINE_BATCH_SIZE):
+        Timeline.objects.filter(author_id__in=batch).delete()
+        _fill(batch)
@@ -8,6 +8,8 @@ urlpatterns = [
     path("", views.index, name="index"),
     path("group/<slug:slug>/", views.group_posts, name="group_list"),
     path("profile/<str:username>/", views.profile, name="profile"),
+    path("search/", views.search, name="search"),
+    path("export/<str:kind>/", views.export, name="export"),
     path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
     path("create/", views.post_create, name="post_create"),
     path("creat/", views.group_create, name="group_create"),
@@ -15,6 +17,11 @@ urlpatterns = [
     path(
         "posts/<int:post_id>/comment/", views.add_comment, name="add_comment"
     ),
+    path(
+        "posts/<int:post_id>/comments/",
+        views.post_comments,
+        name="post_comments",
+    ),
     path("follow/", views.follow_index, name="follow_index"),
     path(
         "profile/<str:username>/follow/",
@@ -1,9 +1,205 @@
+import binascii
+from itertools import islice
+
 from django.conf import settings
 from django.core.paginator import Paginator
+from django.db import connections, router
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_text
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+NEXT = "n"
+PREVIOUS = "p"
+
+
+def position(obj):
+    # Позиция (pub_date, id) объекта модели или строки values().
+    if isinstance(obj, dict):
+        return obj["pub_date"], obj["id"]
+    return obj.pub_date, obj.pk
 
 
-def paginator(object_list, request):
-    # Paginator
-    return Paginator(object_list, settings.PAGE_COUNT).get_page(
-        request.GET.get("page")
+def encode_cursor(direction, obj):
+    # Курсор - направление и позиция (pub_date, id) крайнего объекта.
+    pub_date, pk = position(obj)
+    return urlsafe_base64_encode(
+        force_bytes(f"{direction}|{pub_date.isoformat()}|{pk}")
     )
+
+
+def decode_cursor(cursor):
+    # Битый курсор считаем отсутствующим и отдаем первую страницу.
+    if not cursor:
+        return None, None
+    try:
+        direction, pub_date, pk = force_text(
+            urlsafe_base64_decode(cursor)
+        ).split("|")
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        return None, None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None, None
+    return direction, (pub_date, pk)
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по (pub_date, id) без COUNT(*) и OFFSET.
+
+    Страница строится одним запросом с LIMIT, поэтому любая страница
+    стоит столько же, сколько первая. Общее число объектов считается
+    только в режиме approximate_count и не дальше PAGE_COUNT_LIMIT.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, approximate_count=False):
+        super().__init__(object_list, per_page)
+        self.approximate_count = approximate_count
+        self.count_limit = settings.PAGE_COUNT_LIMIT
+        self._number = 1
+        self._has_next = False
+
+    @property
+    def num_pages(self):
+        # Страниц ровно столько, чтобы Page.has_next/has_previous
+        # давали правильный ответ для текущей страницы.
+        return self._number + int(self._has_next)
+
+    @cached_property
+    def count(self):
+        if not self.approximate_count:
+            return super().count
+        return self.object_list[: self.count_limit + 1].count()
+
+    @property
+    def count_is_exact(self):
+        return self.count <= self.count_limit
+
+    def get_page(self, cursor):
+        direction, position = decode_cursor(cursor)
+        object_list = self.object_list
+        if position is not None:
+            pub_date, pk = position
+            if direction == PREVIOUS:
+                object_list = object_list.filter(
+                    pub_date__gte=pub_date
+                ).exclude(pub_date=pub_date, pk__lte=pk)
+            else:
+                object_list = object_list.filter(
+                    pub_date__lte=pub_date
+                ).exclude(pub_date=pub_date, pk__gte=pk)
+        if direction == PREVIOUS:
+            object_list = object_list.order_by("pub_date", "pk")
+        else:
+            object_list = object_list.order_by("-pub_date", "-pk")
+        items = list(object_list[: self.per_page + 1])
+        has_more = len(items) > self.per_page
+        del items[self.per_page:]
+        if direction == PREVIOUS:
+            items.reverse()
+            has_previous, self._has_next = has_more, bool(items)
+        else:
+            has_previous, self._has_next = position is not None, has_more
+        self._number = 2 if has_previous and items else 1
+        page = self._get_page(items, self._number, self)
+        page.previous_cursor = (
+            encode_cursor(PREVIOUS, items[0]) if page.has_previous() else None
+        )
+        page.next_cursor = (
+            encode_cursor(NEXT, items[-1]) if page.has_next() else None
+        )
+        return page
+
+
+class OffsetPaginator(Paginator):
+    """Первые PAGE_OFFSET_LIMIT страниц по номеру, без COUNT(*).
+
+    Страница читается с LIMIT на одну строку больше, чтобы узнать,
+    есть ли следующая. Ссылки на номера не идут дальше
+    PAGE_OFFSET_LIMIT: с последней такой страницы дальше ведет курсор.
+    """
+
+    is_cursor = False
+
+    def __init__(self, object_list, per_page):
+        super().__init__(object_list, per_page)
+        self._number = 1
+        self._has_next = False
+
+    @property
+    def num_pages(self):
+        return self._number + int(self._has_next)
+
+    @property
+    def page_range(self):
+        return range(1, min(self.num_pages, settings.PAGE_OFFSET_LIMIT) + 1)
+
+    def get_page(self, number):
+        offset = (number - 1) * self.per_page
+        items = list(
+            self.object_list.order_by("-pub_date", "-pk")[
+                offset:offset + self.per_page + 1
+            ]
+        )
+        self._has_next = len(items) > self.per_page
+        del items[self.per_page:]
+        self._number = number
+        page = self._get_page(items, number, self)
+        page.next_cursor = (
+            encode_cursor(NEXT, items[-1])
+            if page.has_next() and number >= settings.PAGE_OFFSET_LIMIT
+            else None
+        )
+        return page
+
+
+def paginator(object_list, request, approximate_count=False):
+    # Неглубокие ?page= обслуживает OffsetPaginator, все остальное -
+    # курсорная пагинация. Ссылок на более глубокие номера страниц
+    # нет, поэтому такие адреса не существуют.
+    number = request.GET.get("page", "")
+    if "cursor" not in request.GET and number.isdigit():
+        if not 0 < int(number) <= settings.PAGE_OFFSET_LIMIT:
+            raise Http404("Страницы с таким номером нет")
+        return OffsetPaginator(object_list, settings.PAGE_COUNT).get_page(
+            int(number)
+        )
+    return CursorPaginator(
+        object_list, settings.PAGE_COUNT, approximate_count
+    ).get_page(request.GET.get("cursor"))
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_insert(model, objects, ignore_conflicts=False):
+    # Как bulk_create, но значения полей пишутся как есть: при raw
+    # вставке pre_save не вызывается, и auto_now_add не затирает
+    # переданные даты публикации. Сигналы, как и у bulk_create,
+    # не рассылаются. Первичный ключ пишется, если задан у всех строк.
+    # Строки делятся на INSERT, как в bulk_create: SQLite не принимает
+    # больше 500 строк и 999 параметров в одном запросе.
+    if not objects:
+        return
+    with_pk = all(obj.pk is not None for obj in objects)
+    fields = [
+        field
+        for field in model._meta.concrete_fields
+        if with_pk or not field.primary_key
+    ]
+    ops = connections[router.db_for_write(model)].ops
+    batch_size = max(ops.bulk_batch_size(fields, objects), 1)
+    for batch in batched(objects, batch_size):
+        model._base_manager._insert(
+            batch, fields=fields, raw=True, ignore_conflicts=ignore_conflicts
+        )
@@ -1,58 +1,182 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
-from .forms import CommentForm, PostForm,GroupForm
-from .models import Follow, Group, Post, User
-from .utils import paginator
+from core.db import primary
+from core.upload_handlers import limited_upload
 
+from . import caching, timeline
+from .counters import get_counters
+from .export import CONTENT_TYPES, FIELDS, export as export_lines
+from .forms import CommentForm, ExportForm, PostForm,GroupForm
+from .models import Comment, Follow, Group, Post, User
+from .search import search as search_posts
+from .utils import CursorPaginator, paginator
 
-@cache_page(20)
+
+# Области кэша страниц для условного GET (caching.conditional)
+def group_scopes(request, slug):
+    return [
+        caching.GROUP.format(pk)
+        for pk in Group.objects.filter(slug=slug).values_list("pk", flat=True)
+    ]
+
+
+def profile_scopes(request, username):
+    return [
+        caching.PROFILE.format(pk)
+        for pk in User.objects.filter(username=username).values_list(
+            "pk", flat=True
+        )
+    ]
+
+
+def post_scopes(request, post_id):
+    # На странице поста видны комментарии и счетчики автора.
+    return [
+        caching.POST.format(post_id),
+        *(
+            caching.PROFILE.format(author_id)
+            for author_id in Post.objects.filter(pk=post_id).values_list(
+                "author_id", flat=True
+            )
+        ),
+    ]
+
+
+def follow_scopes(request):
+    # Ленту подписок меняют любые посты и свои подписки.
+    return [caching.INDEX, caching.PROFILE.format(request.user.pk)]
+
+
+@caching.conditional(lambda request: [caching.INDEX])
+@caching.cache_view([caching.INDEX])
 def index(request):
     # Главная страница
     template = "posts/index.html"
     context = {
-        "page_obj": paginator(Post.objects.all(), request),
+        "page_obj": paginator(Post.objects.for_feed(), request),
     }
     return render(request, template, context)
 
 
+@caching.conditional(group_scopes)
 def group_posts(request, slug):
     # Страница с группами
     template = "posts/group_list.html"
     group = get_object_or_404(Group, slug=slug)
-    return render(
+    return caching.cached_response(
         request,
-        template,
-        {
-            "group": group,
-            "page_obj": paginator(group.posts.all(), request),
-        },
+        [caching.GROUP.format(group.pk)],
+        lambda: render(
+            request,
+            template,
+            {
+                "group": group,
+                "page_obj": paginator(group.posts.for_feed(), request),
+            },
+        ),
     )
 
 
+@caching.conditional(profile_scopes)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
+    return caching.cached_response(
+        request,
+        [caching.PROFILE.format(author.pk)],
+        lambda: render(
+            request,
+            "posts/profile.html",
+            {
+                "author": author,
+                "counters": get_counters(author),
+                "page_obj": paginator(author.posts.for_feed(), request),
+                "following": request.user.is_authenticated
+                and request.user != author
+                and Follow.objects.filter(
+                    author=author, user=request.user
+                ).exists(),
+            },
+        ),
+    )
+
+
+def search(request):
+    # Поиск по тексту постов. Порядок - по релевантности, поэтому
+    # пагинация обычная, а выдача ограничена SEARCH_RESULTS_LIMIT.
+    query = request.GET.get("q", "").strip()
+    results = search_posts(query)[: settings.SEARCH_RESULTS_LIMIT]
     context = {
-        "author": author,
-        "page_obj": paginator(author.posts.all(), request),
-        "following": request.user.is_authenticated
-        and request.user != author
-        and Follow.objects.filter(author=author, user=request.user).exists(),
+        "query": query,
+        "page_obj": Paginator(results, settings.PAGE_COUNT).get_page(
+            request.GET.get("page")
+        ),
     }
-    return render(request, "posts/profile.html", context)
+    return render(request, "posts/search.html", context)
+
 
+@staff_member_required
+def export(request, kind):
+    # Потоковая выгрузка постов или комментариев для модераторов
+    if kind not in FIELDS:
+        raise Http404
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    response = StreamingHttpResponse(
+        export_lines(kind, **form.cleaned_data),
+        content_type=CONTENT_TYPES[form.cleaned_data["format"]],
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{kind}.{form.cleaned_data["format"]}"'
+    )
+    return response
 
+
+def comments_page(post_id, cursor=None):
+    return CursorPaginator(
+        Comment.objects.filter(post_id=post_id).for_feed(),
+        settings.COMMENT_PAGE_COUNT,
+    ).get_page(cursor)
+
+
+@caching.conditional(post_scopes)
 def post_detail(request, post_id):
-    # Показывает пост
+    # Показывает пост и первую порцию комментариев
     template = "posts/post_detail.html"
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related("author", "group"), id=post_id
+    )
     context = {
         "post": post,
+        "counters": get_counters(post.author),
+        "comments": comments_page(post.pk),
         "form": CommentForm(),
     }
     return render(request, template, context)
 
+
+def post_comments(request, post_id):
+    # Следующая порция комментариев для подгрузки на странице поста
+    template = "posts/includes/comment_list.html"
+    comments = comments_page(post_id, request.GET.get("cursor"))
+    # Пустая порция бывает и у несуществующего поста: проверяем только
+    # ее, чтобы обычная подгрузка оставалась одним запросом.
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    context = {
+        "post_id": post_id,
+        "comments": comments,
+    }
+    return render(request, template, context)
+
+
+@primary
 @login_required
 def group_create(request):
     form = GroupForm(request.POST or None)
@@ -63,7 +187,10 @@ def group_create(request):
     return redirect("posts:group_list", group.slug)
 
 
+@primary
 @login_required
+@limited_upload
+@transaction.atomic
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if not form.is_valid():
@@ -74,7 +201,10 @@ def post_create(request):
     return redirect("posts:profile", post.author)
 
 
+@primary
 @login_required
+@limited_upload
+@transaction.atomic
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if request.user != post.author:
@@ -90,7 +220,9 @@ def post_edit(request, post_id):
     return redirect("posts:post_detail", post.id)
 
 
+@primary
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     # Добавить комментарий
     form = CommentForm(request.POST or None)
@@ -103,17 +235,18 @@ def add_comment(request, post_id):
 
 
 @login_required
+@caching.conditional(follow_scopes)
 def follow_index(request):
     tempalate = "posts/follow.html"
     context = {
-        "page_obj": paginator(
-            Post.objects.filter(author__following__user=request.user), request
-        ),
+        "page_obj": paginator(timeline.feed(request.user), request),
     }
     return render(request, tempalate, context)
 
 
+@primary
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     follow_author = get_object_or_404(User, username=username)
     if follow_author != request.user and (
@@ -123,7 +256,9 @@ def profile_follow(request, username):
     return redirect("posts:profile", username)
 
 
+@primary
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     get_object_or_404(
         Follow, author__username=username, user=request.user
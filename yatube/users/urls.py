@@ -10,6 +10,8 @@ from django.contrib.auth.views import (
 )
 from django.urls import path, reverse_lazy
 
+from core.db import primary
+
 from . import views
 
 app_name = "users"
@@ -21,7 +23,7 @@ urlpatterns = [
         LogoutView.as_view(template_name="users/logged_out.html"),
         name="logout",
     ),
-    path("signup/", views.SignUp.as_view(), name="signup"),
+    path("signup/", primary(views.SignUp.as_view()), name="signup"),
     path(
         "login/",
         LoginView.as_view(template_name="users/login.html"),
@@ -1,7 +1,10 @@
 import os
+import sys
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+TESTING = sys.argv[1:2] == ["test"] or "pytest" in sys.modules
+
 SECRET_KEY = (
     "django-insecure-x1gexxaa$!6$mzx_nh2yr97h#^21433zfc@tbuzmar-!#^90no"
 )
@@ -23,12 +26,15 @@ INSTALLED_APPS = [
     "users.apps.UsersConfig",
     "core.apps.CoreConfig",
     "about.apps.AboutConfig",
+    "api.apps.ApiConfig",
     "sorl.thumbnail",
     'debug_toolbar',
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.InstrumentationMiddleware",
+    "core.middleware.PrimaryReplicaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -42,12 +48,26 @@ ROOT_URLCONF = "yatube.urls"
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 
+TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+
+# Профиль для продакшена: скомпилированные шаблоны живут в памяти
+# процесса (cached.Loader), а wsgi.py компилирует их при старте.
+# С DEBUG шаблоны перечитываются, чтобы правки были видны сразу.
+TEMPLATE_CACHE = not DEBUG
+
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.template_backends.InstrumentedDjangoTemplates",
         "DIRS": [TEMPLATES_DIR],
-        "APP_DIRS": True,
         "OPTIONS": {
+            "loaders": [
+                ("django.template.loaders.cached.Loader", TEMPLATE_LOADERS)
+            ]
+            if TEMPLATE_CACHE
+            else TEMPLATE_LOADERS,
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -59,13 +79,52 @@ TEMPLATES = [
     },
 ]
 
+# Шаблоны приложений подключены загрузчиком app_directories в
+# TEMPLATE_LOADERS, APP_DIRS с явными loaders не задается.
+SILENCED_SYSTEM_CHECKS = ["debug_toolbar.W006"]
+
 WSGI_APPLICATION = "yatube.wsgi.application"
 
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
-    }
+        "CONN_MAX_AGE": 600,
+    },
+    # Копия default только для чтения. Локально ее обновляет
+    # manage.py replicate, в тестах это та же база, что и default.
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(BASE_DIR, "db_replica.sqlite3"),
+        "CONN_MAX_AGE": 600,
+        "TEST": {"MIRROR": "default"},
+    },
+}
+
+DATABASE_ROUTERS = ["core.db.PrimaryReplicaRouter"]
+
+# Алиасы реплик, из которых читают безопасные запросы, например
+# ["replica"]. Пустой список - все идет в default.
+DATABASE_REPLICAS = []
+
+# Отставание реплик, с. Столько клиент после записи читает из default
+# (cookie REPLICA_COOKIE), и столько страницы после записи строятся
+# по default.
+REPLICA_LAG = 5
+
+REPLICA_COOKIE = "primary"
+
+# Применяются к каждому соединению с SQLite (core.db.configure_sqlite).
+# WAL разрешает чтение во время записи, NORMAL в режиме WAL не теряет
+# согласованность при сбое, busy_timeout (мс) - ожидание блокировки
+# записи вместо немедленного "database is locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -64 * 1024,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -107,16 +166,97 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 PAGE_COUNT = 10
 
+PAGE_OFFSET_LIMIT = 5
+
+PAGE_COUNT_LIMIT = 1000
+
+COMMENT_PAGE_COUNT = 20
+
+SEARCH_RESULTS_LIMIT = 1000
+
+API_PAGE_COUNT = 20
+
+EXPORT_CHUNK_SIZE = 2000
+
+TIMELINE_FANOUT_LIMIT = 1000
+
+TIMELINE_CELEBRITY_TIMEOUT = 300
+
+TIMELINE_BATCH_SIZE = 1000
+
 CSRF_FAILURE_VIEW = "core.views.csrf_failure"
 
 MEDIA_URL = "/media/"
 
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+PAGE_CACHE_TIMEOUT = None
+
+# Отрендеренные карточки постов (posts.fragments). Устаревшая
+# карточка перезаписывается на месте, редко читаемые истекают.
+CARD_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+CACHE_LOCK_TIMEOUT = 10
+
+# Сколько секунд ждать пересчета чужим воркером, прежде чем
+# посчитать самому (core.cache.single_flight).
+CACHE_LOCK_WAIT = 0.5
+
+CACHE_STALE_TIMEOUT = 60
+
+CACHE_EARLY_EXPIRY_BETA = 1.0
+
+# Разметок виджетов пустых форм в памяти процесса
+# (core.templatetags.user_filters), 0 - не кэшировать.
+FORM_WIDGET_CACHE_SIZE = 1000
+
+# Картинки постов пишутся во временный файл и обрезаются на
+# FILE_UPLOAD_MAX_SIZE байтах (core.upload_handlers.limited_upload).
+FILE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+
+# Картинки с большим числом пикселей отклоняются по заголовку,
+# а оригиналы со стороной больше IMAGE_MAX_DIMENSION уменьшаются в фоне.
+IMAGE_MAX_PIXELS = 50_000_000
+
+IMAGE_MAX_DIMENSION = 4096
+
+# В тестах миниатюры в фоне не строятся: воркер писал бы во временный
+# MEDIA_ROOT, пока тест его удаляет.
+THUMBNAIL_WORKERS = 0 if TESTING else 2
+
+THUMBNAIL_PENDING_TIMEOUT = 300
+
+# Столько секунд картинку, миниатюры которой не удалось построить,
+# не ставят в очередь снова.
+THUMBNAIL_FAILURE_TIMEOUT = 3600
+
+# Доля запросов, для которых InstrumentationMiddleware собирает метрики
+# (0 - выключено), и приложения, запросы к которым замеряются.
+INSTRUMENTATION_SAMPLE_RATE = 0.1
+
+INSTRUMENTATION_NAMESPACES = ("posts", "api")
+
+INSTRUMENTATION_FLUSH_INTERVAL = 10
+
+# Тесты очищают кэш, поэтому работают со своим файлом, а не с кэшем
+# разработчика.
 CACHES = {
     "default": {
+        "BACKEND": "core.cache_backends.SQLiteCache",
+        "LOCATION": os.path.join(
+            BASE_DIR, "test_cache.sqlite3" if TESTING else "cache.sqlite3"
+        ),
+        "OPTIONS": {
+            "MAX_ENTRIES": 10000,
+            "MAX_SIZE": 256 * 1024 * 1024,
+        },
+    },
+    # Подменяет default на время bench_templates, который сбрасывает
+    # кэш перед каждым запросом.
+    "bench": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-    }
+        "LOCATION": "bench",
+    },
 }
 
 
@@ -1,7 +1,14 @@
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from core.template_backends import warm_up
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
 
 application = get_wsgi_application()
+
+# Шаблоны компилируются до первого запроса.
+if settings.TEMPLATE_CACHE:
+    warm_up()